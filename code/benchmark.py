@@ -0,0 +1,263 @@
+from __future__ import annotations
+
+import os, sys, time, datetime, json, random, platform, subprocess, tempfile, tracemalloc, gc, math
+from typing import Callable
+from dataclasses import dataclass
+
+# save runs and config to a temporary folder, so the player's saves are never touched
+# has to be set before main is imported, as that loads the save paths
+_save_folder = tempfile.TemporaryDirectory()
+os.environ["NATURES_ASCENT_SAVES"] = _save_folder.name
+
+# main sets the working directory to the project root
+import main
+import pygame
+
+from engine import Logger, Profiler
+from entity.enemy import Slime, TreeBoss, Attack8Projectiles
+from item.weapon import FireballSpell
+from screens import Level
+from world.floor import Room, SpecialRoom, SpawnRoom, BossRoom
+from util.constants import *
+
+# called before every frame, with the frame number (negative while warming up)
+FrameCallback = Callable[[int], None]
+
+@dataclass
+class Scenario:
+    name: str
+    seed: int
+    # sets up the level, returning a function to run before each frame (or None)
+    setup: Callable[[Level], FrameCallback | None]
+    # frames to run before measuring, e.g to wait for enemies to spawn in
+    warmup_frames: int = 180
+    frames: int = 600
+
+def get_normal_room(level: Level) -> Room:
+    """Returns the first room that is not special, sorted by position so it is the same for every run with the same seed"""
+    rooms = sorted(level.floor_manager.rooms.items())
+    return next(room for _, room in rooms if not isinstance(room, (SpecialRoom, SpawnRoom)))
+
+def get_boss_room(level: Level) -> BossRoom:
+    return next(room for room in level.floor_manager.rooms.values() if isinstance(room, BossRoom))
+
+def get_boss(level: Level) -> TreeBoss:
+    return next(enemy for enemy in level.manager.groups["enemy"] if isinstance(enemy, TreeBoss))
+
+def keep_player_alive(level: Level) -> FrameCallback:
+    player = level.player
+    def callback(frame: int) -> None:
+        player.health = player.stats.health
+    return callback
+
+def setup_idle(level: Level) -> FrameCallback | None:
+    return None
+
+def setup_slimes(level: Level) -> FrameCallback | None:
+    room = get_normal_room(level)
+    room._possible_enemies = {Slime: 50}
+    level.player.rect.center = room.bounding_rect.center
+    return keep_player_alive(level)
+
+def setup_boss_fight(level: Level) -> FrameCallback | None:
+    room = get_boss_room(level)
+    level.player.rect.center = room.bounding_rect.center + pygame.Vector2(0, TILE_SIZE * 3)
+    keep_alive = keep_player_alive(level)
+    def callback(frame: int) -> None:
+        keep_alive(frame)
+        # only use the projectile attack, once the boss has spawned
+        for enemy in level.manager.groups["enemy"]:
+            if isinstance(enemy, TreeBoss):
+                enemy.possible_attacks = [Attack8Projectiles]
+    return callback
+
+def setup_fireball_spam(level: Level) -> FrameCallback | None:
+    room = get_normal_room(level)
+    room._possible_enemies = {Slime: 10}
+    level.player.rect.center = room.bounding_rect.center
+    level.player.inventory.set_weapon(1, FireballSpell)
+    level.player.inventory.spell.upgrade(3)
+    keep_alive = keep_player_alive(level)
+    def callback(frame: int) -> None:
+        keep_alive(frame)
+        if frame % 5 == 0:
+            level.player.spell_cd = 0
+            level.player.try_spell()
+    return callback
+
+def setup_coin_drop(level: Level) -> FrameCallback | None:
+    room = get_boss_room(level)
+    level.player.rect.center = room.bounding_rect.center + pygame.Vector2(0, TILE_SIZE * 3)
+    keep_alive = keep_player_alive(level)
+    def callback(frame: int) -> None:
+        keep_alive(frame)
+        # kill the boss on the first measured frame, and stand close enough for the coins to be picked up
+        if frame == 0:
+            boss = get_boss(level)
+            boss.kill()
+            level.player.rect.center = boss.rect.center + pygame.Vector2(0, TILE_SIZE * 1.5)
+    return callback
+
+SCENARIOS = [
+    Scenario("idle", seed = 1, setup = setup_idle, warmup_frames = 60),
+    Scenario("slimes-50", seed = 2, setup = setup_slimes),
+    Scenario("boss-fight", seed = 3, setup = setup_boss_fight),
+    Scenario("fireball-spam", seed = 4, setup = setup_fireball_spam),
+    Scenario("coin-drop", seed = 5, setup = setup_coin_drop),
+]
+
+def start_level(game: main.Game, seed: int) -> Level:
+    """Start a new level on the game, generated from ``seed``"""
+    # go through the menu, as setting the same screen does nothing
+    game.set_screen("menu")
+    game.step(1)
+    random.seed(seed)
+    game.set_screen("level")
+    game.step(1)
+    return game.current_screen_instance
+
+def run_frames(game: main.Game, n_frames: int, callback: FrameCallback | None, first_frame: int = 0) -> tuple[list[float], list[float]]:
+    """Run frames one tick at a time, returning how long each update and render took in seconds"""
+    update_times = []
+    render_times = []
+    for i in range(first_frame, first_frame + n_frames):
+        if callback: callback(i)
+
+        start_time = time.perf_counter()
+        with Profiler.scope("events"):
+            game.handle_events()
+        game.tick(1 / TICK_RATE)
+        update_end = time.perf_counter()
+        game.draw()
+        render_end = time.perf_counter()
+        Profiler.end_frame()
+
+        update_times.append(update_end - start_time)
+        render_times.append(render_end - update_end)
+    return update_times, render_times
+
+def summarise(times: list[float]) -> dict[str, float]:
+    """Returns the mean, 95th percentile, 99th percentile and max of ``times`` in milliseconds"""
+    ordered = sorted(times)
+    percentile = lambda p: ordered[max(math.ceil(len(ordered) * p) - 1, 0)]
+    return {
+        "mean": round(sum(ordered) / len(ordered) * 1000, 4),
+        "p95": round(percentile(0.95) * 1000, 4),
+        "p99": round(percentile(0.99) * 1000, 4),
+        "max": round(ordered[-1] * 1000, 4),
+    }
+
+def run_scenario(game: main.Game, scenario: Scenario) -> dict:
+    # timed run
+    level = start_level(game, scenario.seed)
+    callback = scenario.setup(level)
+    run_frames(game, scenario.warmup_frames, callback, -scenario.warmup_frames)
+
+    Profiler.set_enabled(True, history_length = scenario.frames)
+    gc_collections = sum(generation["collections"] for generation in gc.get_stats())
+    update_times, render_times = run_frames(game, scenario.frames, callback)
+    gc_collections = sum(generation["collections"] for generation in gc.get_stats()) - gc_collections
+    scopes = {
+        name: {"mean": round(avg * 1000, 4), "p99": round(p99 * 1000, 4)}
+        for name, (avg, p99) in Profiler.get_stats().items() if name != "frame"
+    }
+    Profiler.set_enabled(False)
+
+    # run again from the same seed while tracing allocations, as tracing slows everything down
+    level = start_level(game, scenario.seed)
+    callback = scenario.setup(level)
+    run_frames(game, scenario.warmup_frames, callback, -scenario.warmup_frames)
+
+    tracemalloc.start()
+    start_memory, _ = tracemalloc.get_traced_memory()
+    start_blocks = sys.getallocatedblocks()
+    run_frames(game, scenario.frames, callback)
+    end_memory, peak_memory = tracemalloc.get_traced_memory()
+    end_blocks = sys.getallocatedblocks()
+    tracemalloc.stop()
+
+    frame_times = [u + r for u, r in zip(update_times, render_times)]
+    total_update = sum(update_times)
+    return {
+        "seed": scenario.seed,
+        "frames": scenario.frames,
+        "frame_ms": summarise(frame_times),
+        "update_ms": summarise(update_times),
+        "render_ms": summarise(render_times),
+        "update_fraction": round(total_update / sum(frame_times), 4),
+        "scopes_ms": scopes,
+        "allocations": {
+            "net_kb": round((end_memory - start_memory) / 1024, 2),
+            "peak_kb": round((peak_memory - start_memory) / 1024, 2),
+            "net_blocks": end_blocks - start_blocks,
+            "gc_collections": gc_collections,
+        },
+    }
+
+def get_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output = True, text = True, check = True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+def get_option(name: str, default: str) -> str:
+    """Get the value after ``name`` in the command line arguments"""
+    if name in sys.argv:
+        index = sys.argv.index(name)
+        if index + 1 < len(sys.argv):
+            return sys.argv[index + 1]
+    return default
+
+def run_benchmarks(scenarios: list[Scenario], out_path: str) -> dict:
+    """Run each scenario in a headless game, and write the results as json to ``out_path``"""
+    game = main.Game(headless = True)
+    results = {
+        "commit": get_commit(),
+        "time": f"{datetime.datetime.now():%Y-%m-%d %H:%M:%S}",
+        "python": platform.python_version(),
+        "pygame": pygame.version.ver,
+        "platform": platform.platform(),
+        "tick_rate": TICK_RATE,
+        "scenarios": {},
+    }
+    for scenario in scenarios:
+        Logger.info(f"Running benchmark [{scenario.name}]")
+        results["scenarios"][scenario.name] = run_scenario(game, scenario)
+        frame_ms = results["scenarios"][scenario.name]["frame_ms"]
+        Logger.info(f"Benchmark [{scenario.name}] mean = {frame_ms['mean']} ms, p99 = {frame_ms['p99']} ms")
+    pygame.quit()
+
+    out_folder = os.path.dirname(out_path)
+    if out_folder and not os.path.exists(out_folder):
+        os.makedirs(out_folder)
+    with open(out_path, "w") as f:
+        json.dump(results, f, indent = 4)
+    Logger.info(f"Saved benchmark results to {out_path}")
+    return results
+
+def main_benchmark() -> None:
+    """
+    Runs gameplay benchmarks.
+
+    Options:
+    - ``-o <path>``: where to write results (default ``debug/benchmark-<commit>.json``)
+    - ``-s <name,name>``: only run the named scenarios
+    - ``-frames <n>``: override number of measured frames
+    """
+    Logger.start()
+    Logger.allow_all()
+
+    scenarios = SCENARIOS
+    names = get_option("-s", "")
+    if names:
+        scenarios = [scenario for scenario in SCENARIOS if scenario.name in names.split(",")]
+
+    frames = get_option("-frames", "")
+    if frames:
+        for scenario in scenarios:
+            scenario.frames = int(frames)
+
+    run_benchmarks(scenarios, get_option("-o", os.path.join("debug", f"benchmark-{get_commit()}.json")))
+
+if __name__ == "__main__":
+    main_benchmark()
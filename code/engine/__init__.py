@@ -1,6 +1,8 @@
+from .logger import Logger
+from .profiler import Profiler
 from .node import Node
 from .manager import Manager
 from .screen import Screen
 from .sprite import Sprite
-from .logger import Logger
+from .group import RenderGroup, SpatialHashGroup, BroadphaseGroup
 from .animation import AnimationManager
\ No newline at end of file
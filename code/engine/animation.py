@@ -11,7 +11,7 @@ class AnimationManager(Node):
     """
     def __init__(self, parent: Sprite, frame_time = ANIMATION_FRAME_TIME) -> None:
         super().__init__(parent)
-        self._animations: dict[str, list[pygame.Surface]] = {}
+        self._animations: dict[str, list[pygame.Surface] | tuple[pygame.Surface, ...]] = {}
         self._current = ""
 
         self._frame_time = frame_time
@@ -34,8 +34,8 @@ class AnimationManager(Node):
     def current(self) -> str:
         return self._current
 
-    def add_animation(self, key: str, animation: list[pygame.Surface]) -> AnimationManager:
-        """Add an animation. Can be chain called."""
+    def add_animation(self, key: str, animation: list[pygame.Surface] | tuple[pygame.Surface, ...]) -> AnimationManager:
+        """Add an animation. Can be chain called. The frames may be shared with other sprites, so are never changed."""
         self._animations[key] = animation
         return self
 
@@ -51,7 +51,7 @@ class AnimationManager(Node):
 
         return self._animations[key][0]
 
-    def get_animation(self, key: str) -> list[pygame.Surface]:
+    def get_animation(self, key: str) -> list[pygame.Surface] | tuple[pygame.Surface, ...]:
         return self._animations[key]
     
     def rotate_animation(self, key: str, angle: float) -> None:
@@ -0,0 +1,107 @@
+from __future__ import annotations
+
+import pygame, os, mmap, struct, json, hashlib
+from .logger import Logger
+
+# file layout: header, json index, then the raw RGBA pixels of each image one after another
+_MAGIC = b"NAPK"
+_VERSION = 1
+_HEADER = struct.Struct("<4sII") # magic, version, index length
+
+def _hash_file(path: str) -> str:
+    with open(path, "rb") as f:
+        return hashlib.sha1(f.read()).hexdigest()
+
+def write_asset_pack(path: str, images: dict[str, tuple[str, pygame.Surface]], scale: int) -> None:
+    """
+    Write images to an asset pack at ``path``.
+
+    ``images`` maps each key to the path of its source file and the loaded (and scaled) surface.
+    """
+    index = {"scale": scale, "images": {}}
+    pixel_data = []
+    offset = 0
+    for key, (source_path, surface) in images.items():
+        pixels = pygame.image.tobytes(surface, "RGBA")
+        stat = os.stat(source_path)
+        index["images"][key] = {
+            "offset": offset,
+            "width": surface.get_width(),
+            "height": surface.get_height(),
+            "mtime": stat.st_mtime_ns,
+            "size": stat.st_size,
+            "hash": _hash_file(source_path),
+        }
+        pixel_data.append(pixels)
+        offset += len(pixels)
+
+    index_bytes = json.dumps(index).encode()
+    with open(path, "wb") as f:
+        f.write(_HEADER.pack(_MAGIC, _VERSION, len(index_bytes)))
+        f.write(index_bytes)
+        for pixels in pixel_data:
+            f.write(pixels)
+
+class AssetPack:
+    """
+    Memory mapped asset pack of pre-scaled images, written by ``write_asset_pack``.
+
+    Images are only returned if their source file has not changed since the pack was written, checked by
+    modification time and size, or by hash if those differ.
+    """
+    def __init__(self, path: str) -> None:
+        self.path = path
+        with open(path, "rb") as f:
+            self._map = mmap.mmap(f.fileno(), 0, access = mmap.ACCESS_READ)
+
+        try:
+            magic, version, index_length = _HEADER.unpack_from(self._map, 0)
+            if magic != _MAGIC or version != _VERSION:
+                raise ValueError(f"unsupported asset pack version {version}")
+            index = json.loads(self._map[_HEADER.size:_HEADER.size + index_length])
+        except (struct.error, ValueError) as e:
+            self.close()
+            raise ValueError(f"Invalid asset pack: {e}")
+
+        self.scale: int = index["scale"]
+        self._images: dict[str, dict] = index["images"]
+        self._data_start = _HEADER.size + index_length
+
+    @staticmethod
+    def open(path: str) -> AssetPack | None:
+        """Open the asset pack at ``path``, or return None if it does not exist or cannot be read"""
+        if not os.path.exists(path): return None
+        try:
+            return AssetPack(path)
+        except (OSError, ValueError) as e:
+            Logger.warn(f"Could not open asset pack at {path} ({e})")
+            return None
+
+    def _is_fresh(self, entry: dict, source_path: str) -> bool:
+        try:
+            stat = os.stat(source_path)
+        except OSError:
+            return False
+        if stat.st_mtime_ns == entry["mtime"] and stat.st_size == entry["size"]:
+            return True
+        # file may have been touched without changing (e.g by git), so compare contents
+        return stat.st_size == entry["size"] and _hash_file(source_path) == entry["hash"]
+
+    def get_image(self, key: str, source_path: str) -> pygame.Surface | None:
+        """Returns the image at ``key`` converted for the display, or None if it is not in the pack or is out of date."""
+        entry = self._images.get(key)
+        if entry == None: return None
+        if not self._is_fresh(entry, source_path):
+            Logger.debug(f"Asset pack image [{key}] is out of date, loading from {source_path}.")
+            return None
+
+        size = (entry["width"], entry["height"])
+        start = self._data_start + entry["offset"]
+        pixels = memoryview(self._map)[start:start + size[0] * size[1] * 4]
+        # convert copies the pixels, so the surface does not rely on the map staying open
+        image = pygame.image.frombuffer(pixels, size, "RGBA").convert_alpha()
+        pixels.release()
+        return image
+
+    def close(self) -> None:
+        self._map.close()
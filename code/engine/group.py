@@ -0,0 +1,275 @@
+from __future__ import annotations
+from typing import TYPE_CHECKING
+
+import pygame, bisect, itertools
+from util.constants import *
+from .types import *
+
+if TYPE_CHECKING:
+    from .sprite import Sprite
+
+def render_key(sprite: Sprite) -> tuple[float, float]:
+    """Key that sprites are drawn in - z index first, then y position"""
+    return (sprite.z_index, sprite.rect.centery)
+
+class RenderGroup(pygame.sprite.Group):
+    """
+    Sprite group that keeps its sprites in draw order between frames, instead of sorting every sprite each frame.
+
+    Sprites with ``Sprite.static == True`` are inserted once into a sorted list the first time they are drawn.
+    All other sprites are kept in a separate list which is re-sorted every frame - as this list is nearly sorted
+    from the previous frame, the sort is close to linear.
+
+    Call ``RenderGroup.store_positions`` before each update so moving sprites can be drawn between their last two positions.
+    """
+    def __init__(self, *sprites) -> None:
+        # static sprites stored sorted by render key, with the key they were inserted with
+        self._static_sprites: list[Sprite] = []
+        self._static_keys: list[tuple[float, float]] = []
+        self._static_key_of: dict[Sprite, tuple[float, float]] = {}
+        # static sprites waiting to be placed (their rect may not be set until after being added)
+        self._pending_static: dict[Sprite, None] = {}
+
+        self._dynamic_sprites: list[Sprite] = []
+        # positions of moving sprites before the last update
+        self._previous_positions: dict[Sprite, tuple[float, float]] = {}
+
+        super().__init__(*sprites)
+
+    def add_internal(self, sprite: Sprite, layer = None) -> None:
+        super().add_internal(sprite, layer)
+        if getattr(sprite, "static", False):
+            self._pending_static[sprite] = None
+        else:
+            self._dynamic_sprites.append(sprite)
+
+    def remove_internal(self, sprite: Sprite) -> None:
+        super().remove_internal(sprite)
+        if sprite in self._pending_static:
+            del self._pending_static[sprite]
+        elif sprite in self._static_key_of:
+            self._remove_static(sprite)
+        else:
+            self._dynamic_sprites.remove(sprite)
+            self._previous_positions.pop(sprite, None)
+
+    def _remove_static(self, sprite: Sprite) -> None:
+        key = self._static_key_of.pop(sprite)
+        # search through sprites with the same key to find this one
+        index = bisect.bisect_left(self._static_keys, key)
+        while self._static_sprites[index] is not sprite:
+            index += 1
+        del self._static_sprites[index]
+        del self._static_keys[index]
+
+    def _place_pending(self) -> None:
+        for sprite in self._pending_static:
+            key = render_key(sprite)
+            index = bisect.bisect_right(self._static_keys, key)
+            self._static_keys.insert(index, key)
+            self._static_sprites.insert(index, sprite)
+            self._static_key_of[sprite] = key
+        self._pending_static.clear()
+
+    def refresh(self, sprite: Sprite) -> None:
+        """Re-place a static sprite after its z index or position has changed."""
+        if sprite in self._static_key_of:
+            self._remove_static(sprite)
+            self._pending_static[sprite] = None
+
+    def store_positions(self) -> None:
+        """Remember the current position of every moving sprite. Should be called before every update."""
+        self._previous_positions = {sprite: sprite.rect.topleft for sprite in self._dynamic_sprites}
+
+    def get_draw_position(self, sprite: Sprite, interpolation: float) -> tuple[float, float]:
+        """Returns the top left of ``sprite``, ``interpolation`` (0-1) of the way between its position before and after the last update"""
+        previous = self._previous_positions.get(sprite)
+        if previous == None or interpolation >= 1:
+            return sprite.rect.topleft
+        return (
+            previous[0] + (sprite.rect.x - previous[0]) * interpolation,
+            previous[1] + (sprite.rect.y - previous[1]) * interpolation
+        )
+
+    def ordered_sprites(self) -> list[Sprite]:
+        """Returns a list of all the sprites in the order they should be drawn"""
+        self._place_pending()
+        self._dynamic_sprites.sort(key = render_key)
+
+        # merge moving sprites into the already sorted static sprites
+        static_sprites = self._static_sprites
+        static_keys = self._static_keys
+        ordered = []
+        i = 0
+        for sprite in self._dynamic_sprites:
+            j = bisect.bisect_right(static_keys, render_key(sprite), i)
+            ordered.extend(static_sprites[i:j])
+            ordered.append(sprite)
+            i = j
+        ordered.extend(static_sprites[i:])
+
+        return ordered
+
+class SpatialHashGroup(pygame.sprite.Group):
+    """
+    Sprite group that buckets its sprites into a uniform grid of ``cell_size`` cells, so sprites in an area can be
+    found without checking every sprite in the group.
+
+    Sprites are placed into the grid the next time the group is queried, so their rect can be set after being added.
+    Sprites should not move after they are placed - call ``SpatialHashGroup.refresh`` if they do.
+    """
+    def __init__(self, *sprites, cell_size: int = TILE_SIZE) -> None:
+        self.cell_size = cell_size
+
+        self._cells: dict[tuple[int, int], list[Sprite]] = {}
+        self._cells_of: dict[Sprite, list[tuple[int, int]]] = {}
+        self._pending: dict[Sprite, None] = {}
+
+        # store the order sprites were added in so queries are returned in the same order as iterating the group
+        self._order: dict[Sprite, int] = {}
+        self._counter = itertools.count()
+
+        super().__init__(*sprites)
+
+    def add_internal(self, sprite: Sprite, layer = None) -> None:
+        super().add_internal(sprite, layer)
+        self._order[sprite] = next(self._counter)
+        self._pending[sprite] = None
+
+    def remove_internal(self, sprite: Sprite) -> None:
+        super().remove_internal(sprite)
+        del self._order[sprite]
+        if sprite in self._pending:
+            del self._pending[sprite]
+        else:
+            self._remove_from_cells(sprite)
+
+    def _get_cells(self, rect: pygame.Rect | pygame.FRect) -> list[tuple[int, int]]:
+        return [
+            (x, y)
+            for x in range(int(rect.left // self.cell_size), int(rect.right // self.cell_size) + 1)
+            for y in range(int(rect.top // self.cell_size), int(rect.bottom // self.cell_size) + 1)
+        ]
+
+    def _remove_from_cells(self, sprite: Sprite) -> None:
+        for cell in self._cells_of.pop(sprite):
+            bucket = self._cells[cell]
+            bucket.remove(sprite)
+            if not bucket:
+                del self._cells[cell]
+
+    def _place_pending(self) -> None:
+        for sprite in self._pending:
+            cells = self._get_cells(sprite.rect)
+            for cell in cells:
+                self._cells.setdefault(cell, []).append(sprite)
+            self._cells_of[sprite] = cells
+        self._pending.clear()
+
+    def refresh(self, sprite: Sprite) -> None:
+        """Re-place a sprite after its rect has changed."""
+        if sprite in self._cells_of:
+            self._remove_from_cells(sprite)
+            self._pending[sprite] = None
+
+    def query(self, rect: pygame.Rect | pygame.FRect) -> list[Sprite]:
+        """Returns the sprites in the group whose rect collides with ``rect``, in the order they were added."""
+        if self._pending:
+            self._place_pending()
+
+        found = set()
+        for cell in self._get_cells(rect):
+            bucket = self._cells.get(cell)
+            if bucket == None: continue
+            for sprite in bucket:
+                if sprite.rect.colliderect(rect):
+                    found.add(sprite)
+
+        return sorted(found, key = self._order.__getitem__)
+
+class BroadphaseGroup(pygame.sprite.Group):
+    """
+    Sprite group for sprites that move every frame, e.g. enemies, which can be searched by area.
+
+    The grid is rebuilt from each sprite's rect and hitbox when ``BroadphaseGroup.rebuild`` is called, which should be once a frame.
+    As sprites keep moving after the grid is built, searched areas are expanded by ``margin``, and results are
+    always checked against the sprite's current rect or hitbox. Sprites added since the last rebuild are always checked.
+    """
+    def __init__(self, *sprites, cell_size: int = TILE_SIZE * 2, margin: int = TILE_SIZE) -> None:
+        self.cell_size = cell_size
+        self.margin = margin
+
+        self._cells: dict[tuple[int, int], list[Sprite]] = {}
+        self._unindexed: list[Sprite] = []
+
+        # store the order sprites were added in so queries are returned in the same order as iterating the group
+        self._order: dict[Sprite, int] = {}
+        self._counter = itertools.count()
+
+        super().__init__(*sprites)
+
+    def add_internal(self, sprite: Sprite, layer = None) -> None:
+        super().add_internal(sprite, layer)
+        self._order[sprite] = next(self._counter)
+        self._unindexed.append(sprite)
+
+    def remove_internal(self, sprite: Sprite) -> None:
+        super().remove_internal(sprite)
+        # sprite is left in the grid until the next rebuild, but is ignored as it has no order
+        del self._order[sprite]
+
+    def _get_cells(self, rect: pygame.Rect | pygame.FRect) -> list[tuple[int, int]]:
+        return [
+            (x, y)
+            for x in range(int(rect.left // self.cell_size), int(rect.right // self.cell_size) + 1)
+            for y in range(int(rect.top // self.cell_size), int(rect.bottom // self.cell_size) + 1)
+        ]
+
+    def rebuild(self) -> None:
+        """Rebuild the grid from the current position of every sprite."""
+        self._cells = {}
+        for sprite in self.spritedict:
+            bounds = sprite.rect.union(getattr(sprite, "hitbox", sprite.rect))
+            for cell in self._get_cells(bounds):
+                self._cells.setdefault(cell, []).append(sprite)
+        self._unindexed = []
+
+    def _get_candidates(self, rect: pygame.Rect | pygame.FRect) -> list[Sprite]:
+        """Returns sprites that could be inside ``rect``, in the order they were added"""
+        search_rect = rect.inflate(self.margin * 2, self.margin * 2)
+        found = set(self._unindexed)
+        for cell in self._get_cells(search_rect):
+            bucket = self._cells.get(cell)
+            if bucket != None:
+                found.update(bucket)
+
+        return sorted(
+            (sprite for sprite in found if sprite in self._order),
+            key = self._order.__getitem__
+        )
+
+    def query_rect(self, rect: pygame.Rect | pygame.FRect) -> list[Sprite]:
+        """Returns the sprites whose hitbox (or rect if it has none) collides with ``rect``"""
+        return [
+            sprite for sprite in self._get_candidates(rect)
+            if getattr(sprite, "hitbox", sprite.rect).colliderect(rect)
+        ]
+
+    def query_radius(self, point: Vec2, radius: float) -> list[Sprite]:
+        """Returns the sprites whose rect center is less than ``radius`` away from ``point``"""
+        search_rect = pygame.FRect(0, 0, radius * 2, radius * 2)
+        search_rect.center = point
+        point = pygame.Vector2(point)
+        return [
+            sprite for sprite in self._get_candidates(search_rect)
+            if (point - sprite.rect.center).magnitude() < radius
+        ]
+
+    def nearest(self, point: Vec2, max_distance: float) -> Sprite | None:
+        """Returns the sprite with rect center closest to ``point``, or None if there are none closer than ``max_distance``"""
+        point = pygame.Vector2(point)
+        return min(
+            self.query_radius(point, max_distance),
+            key = lambda sprite: (point - sprite.rect.center).magnitude_squared(),
+            default = None
+        )
@@ -1,9 +1,12 @@
 from __future__ import annotations
 from typing import TYPE_CHECKING, Literal
 
-import pygame, os
+import pygame, os, time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from .logger import Logger
-from .types import DebugExpandable
+from .asset_pack import AssetPack, write_asset_pack
+from .types import DebugExpandable, Colour
 
 if TYPE_CHECKING:
     from .node import Node
@@ -24,8 +27,16 @@ class Font():
         self._fonts[font_size] = new_font
         return new_font
 
+class KeySet():
+    """Stands in for ``pygame.key.get_pressed`` for a set of keys which are not read from the keyboard directly."""
+    def __init__(self, keys: set[int]) -> None:
+        self._keys = keys
+
+    def __getitem__(self, key: int) -> bool:
+        return key in self._keys
+
 class Manager(DebugExpandable):
-    def __init__(self, game: Game, fps: int = 60, num_channels = 8) -> None:
+    def __init__(self, game: Game, fps: int = 60, num_channels = 8, image_cache_size: int = 16 * 1024 * 1024, text_cache_size: int = 512) -> None:
         self.game = game
 
         # stores groups
@@ -43,6 +54,25 @@ class Manager(DebugExpandable):
 
         # stores loaded assets
         self.assets: dict = {"image": {}, "sound": {}, "font": {}}
+        # stores the path of every asset that can be loaded
+        self._asset_index: dict[str, dict[str, str]] = {"image": {}, "sound": {}, "font": {}}
+        # (asset type, key) of assets that could not be decoded, so they are not tried (and logged) again
+        self._failed_assets: set[tuple[str, str]] = set()
+        # pre-scaled images, used instead of the png files where they are up to date
+        self._asset_pack: AssetPack | None = None
+
+        # images resized by get_image, least recently used first
+        self._image_cache: OrderedDict[tuple[str, float], pygame.Surface] = OrderedDict()
+        self._image_cache_bytes: int = 0
+        self.image_cache_size: int = image_cache_size # in bytes
+        self.image_cache_hits: int = 0
+        self.image_cache_misses: int = 0
+
+        # rendered text, least recently used first
+        self._text_cache: OrderedDict[tuple, pygame.Surface] = OrderedDict()
+        self.text_cache_size: int = text_cache_size # in number of surfaces
+        self.text_cache_hits: int = 0
+        self.text_cache_misses: int = 0
         
         # store volume percentages (0-1 inclusive)
         self._sfx_volume = 0.1
@@ -54,10 +84,18 @@ class Manager(DebugExpandable):
         # store keybinds
         self.keybinds: dict[str, int] = {}
 
+        # keys held, if inputs are being injected (e.g when headless)
+        self._injected_keys: set[int] | None = None
+        # keys pressed since the last update
+        self._just_pressed: set[int] = set()
+
         self.fps: int = fps
         self._dt_adjusted: float = 1
         self._dt_raw: float = 1 / fps
 
+        # how far through the next update the current frame is (0-1), for drawing between update positions
+        self.interpolation: float = 1.0
+
         self._load_scale: int = 1
 
         self._current_cursor: int = pygame.SYSTEM_CURSOR_ARROW
@@ -89,11 +127,15 @@ class Manager(DebugExpandable):
         self._music_volume = v
         pygame.mixer.music.set_volume(v * 3)
 
-    def update_dt(self) -> None:
-        """Updates delta time for current frame. Should be called every frame"""
+    def update_dt(self, frame_time: float | None = None) -> None:
+        """
+        Updates delta time for current frame. Should be called every frame.
+        
+        Uses the time of the last clock tick unless ``frame_time`` (in seconds) is given.
+        """
 
         # do not change these hardcoded values
-        self._dt_raw = self.game.clock.get_time() / 1000
+        self._dt_raw = self.game.clock.get_time() / 1000 if frame_time == None else frame_time
         self._dt_raw = min(self._dt_raw, 0.05) # limit to 3 frame skips
         self._dt_adjusted = 60 * self._dt_raw
 
@@ -101,7 +143,7 @@ class Manager(DebugExpandable):
         self.objects[id] = node
         return node
     
-    def add_window(self, window: pygame.Window, id: str) -> pygame.Window:
+    def add_window(self, window: pygame.Window | None, id: str) -> pygame.Window | None:
         self.windows[id] = window
         self._window_mouse_positions[id] = (-1, -1)
         return window
@@ -115,9 +157,9 @@ class Manager(DebugExpandable):
     def get_object(self, id: str) -> Node|None:
         return self.objects.get(id, None)
 
-    def add_groups(self, names: list[str]) -> None:
+    def add_groups(self, names: list[str], group_type: type[pygame.sprite.AbstractGroup] = pygame.sprite.Group) -> None:
         for name in names:
-            self.groups[name] = pygame.sprite.Group()
+            self.groups[name] = group_type()
 
     def get_mouse_pos(self, window_id: str = "main") -> tuple[int, int]:
         """Get mouse position in the given window"""
@@ -126,6 +168,24 @@ class Manager(DebugExpandable):
     def on_mouse_motion(self, position: tuple[int, int], window_id: str) -> None:
         self._window_mouse_positions[window_id] = position
 
+    def inject_keys(self, held_keys: set[int] | None) -> None:
+        """Override the held keyboard keys with the given keys. Pass ``None`` to read from the keyboard again."""
+        self._injected_keys = held_keys
+
+    def set_just_pressed(self, keys: set[int]) -> None:
+        """Set the keys pressed since the last update. Should be called before every update"""
+        self._just_pressed = keys
+
+    def get_pressed_keys(self) -> pygame.key.ScancodeWrapper | KeySet:
+        """Get the keys currently held down, indexable by key constant. Use instead of ``pygame.key.get_pressed``"""
+        if self._injected_keys == None:
+            return pygame.key.get_pressed()
+        return KeySet(self._injected_keys)
+
+    def get_just_pressed_keys(self) -> KeySet:
+        """Get the keys pressed since the last update, indexable by key constant. Use instead of ``pygame.key.get_just_pressed``"""
+        return KeySet(self._just_pressed)
+
     def cleanup(self) -> None:
         """Call this when switching scenes to avoid memory buildup."""
         self.groups = {}
@@ -141,12 +201,160 @@ class Manager(DebugExpandable):
     def load_cursor(self) -> None:
         pygame.mouse.set_cursor(self._current_cursor)
 
-    def load(self) -> None:
+    def _scan_assets(self) -> list[tuple[str, str, str]]:
+        """Returns the path, asset type and key of every supported file in ./assets"""
+        # maps folder name to extension
+        ext_dir_map = {
+            "png": "image",
+            "ttf": "font",
+            "mp3": "sound",
+        }
+
+        found = []
+        for dirpath, dirnames, filenames in os.walk("assets"):
+            # go through each file
+            for filename in filenames:
+                fullpath = os.path.join(dirpath, filename)
+                extension = os.path.splitext(filename)[1][1:]
+                if extension not in ext_dir_map: continue
+                if extension == "mp3" and "music" in fullpath: continue # don't load music files as they will be streamed
+
+                # trim path down
+                key = fullpath.removeprefix(os.path.join("assets", ext_dir_map[extension]) + os.sep).removesuffix(os.extsep + extension)
+                # replace backslashes with forward
+                key = key.replace(os.sep, "/")
+                found.append((fullpath, ext_dir_map[extension], key))
+        return found
+
+    @staticmethod
+    def _decode_asset(path: str, asset_type: str) -> pygame.Surface | pygame.mixer.Sound | pygame.error:
+        """Read and decode an image or sound file. Safe to call from any thread. Errors are returned instead of raised."""
+        try:
+            if asset_type == "image":
+                return pygame.image.load(path)
+            return pygame.mixer.Sound(path)
+        except pygame.error as e:
+            return e
+
+    def _scale_image(self, image: pygame.Surface) -> pygame.Surface:
+        return pygame.transform.scale(
+            image,
+            (
+                image.get_width() * self._load_scale,
+                image.get_height() * self._load_scale
+            )
+        )
+
+    def _get_packed_image(self, key: str, path: str) -> pygame.Surface | None:
+        if self._asset_pack == None: return None
+        return self._asset_pack.get_image(key, path)
+
+    def _load_files(self, files: list[tuple[str, str, str]], n_threads: int | None = None, use_pack: bool = True) -> dict[str, float]:
+        """
+        Load the given (path, asset type, key) files into ``Manager.assets``, returning the time each phase finished.
+
+        Images are taken from the asset pack if it is up to date. Other files are decoded and scaled across ``n_threads``
+        threads (defaults to a number based on cpu count), and images are converted to the display format on the main thread.
+        """
+        timings = {}
+
+        packed = {}
+        if use_pack and self._asset_pack != None:
+            for path, asset_type, key in files:
+                if asset_type != "image": continue
+                image = self._get_packed_image(key, path)
+                if image != None:
+                    packed[path] = image
+            timings["pack"] = time.perf_counter()
+        to_decode = [file for file in files if file[0] not in packed]
+
+        with ThreadPoolExecutor(max_workers = n_threads) as executor:
+            # decode images and sounds in parallel, fonts are only loaded when used
+            decoded = {}
+            for path, asset_type, key in to_decode:
+                if asset_type == "font":
+                    decoded[path] = Font(path)
+                else:
+                    decoded[path] = executor.submit(Manager._decode_asset, path, asset_type)
+            for path, asset_type, key in to_decode:
+                if asset_type != "font":
+                    decoded[path] = decoded[path].result()
+            timings["decode"] = time.perf_counter()
+
+            # converting needs the display, so must happen on this thread
+            converted = {}
+            for path, asset_type, key in to_decode:
+                if asset_type != "image": continue
+                converted[path] = self._convert_image(path, decoded[path])
+            timings["convert"] = time.perf_counter()
+
+            # scale images up
+            scaled = dict(zip(converted.keys(), executor.map(self._scale_image, converted.values())))
+            scaled.update(packed)
+            timings["scale"] = time.perf_counter()
+
+        for path, asset_type, key in files:
+            if asset_type == "image":
+                self.assets["image"][key] = scaled[path]
+            elif isinstance(decoded[path], pygame.error):
+                Logger.error(f"Could not load {asset_type} file at {path}.", decoded[path])
+                self._failed_assets.add((asset_type, key))
+            else:
+                self.assets[asset_type][key] = decoded[path]
+
+        return timings
+
+    def _convert_image(self, path: str, image: pygame.Surface | pygame.error) -> pygame.Surface:
+        if isinstance(image, pygame.error):
+            Logger.error(f"Could not load image file at {path}.", image)
+            image = pygame.image.load(self.get_path_from_key("error", "image"))
+        return image.convert_alpha()
+
+    def _load_asset(self, asset_type: str, key: str) -> None:
+        """Load a single asset from the index on this thread. Raises KeyError if the key does not exist."""
+        path = self._asset_index[asset_type][key]
+        if asset_type == "font":
+            self.assets["font"][key] = Font(path)
+            return
+
+        if asset_type == "image":
+            packed = self._get_packed_image(key, path)
+            if packed != None:
+                self.assets["image"][key] = packed
+                return
+
+        decoded = Manager._decode_asset(path, asset_type)
+        if asset_type == "image":
+            self.assets["image"][key] = self._scale_image(self._convert_image(path, decoded))
+        elif isinstance(decoded, pygame.error):
+            Logger.error(f"Could not load {asset_type} file at {path}.", decoded)
+            self._failed_assets.add((asset_type, key))
+        else:
+            self.assets[asset_type][key] = decoded
+
+    def _get_asset(self, asset_type: str, key: str):
+        """
+        Get a loaded asset, loading it first if it has not been. Raises KeyError if the key does not exist.
+
+        Returns None for sounds that could not be decoded.
+        """
+        asset = self.assets[asset_type].get(key)
+        if asset == None:
+            if (asset_type, key) in self._failed_assets: return None
+            self._load_asset(asset_type, key)
+            asset = self.assets[asset_type].get(key)
+        return asset
+
+    def load(self, n_threads: int | None = None, lazy: bool = False, pack_path: str | None = None) -> None:
         """
         Loads all supported files in ./assets
 
         Assets folder must contain image, font, sound sub directories
 
+        If ``lazy``, files are only indexed, and each asset is loaded the first time it is used (or by ``Manager.prefetch``).
+        If ``pack_path`` is an asset pack built with ``Manager.build_asset_pack``, images are read from it instead of the png files
+        that have not changed since it was built.
+
         Supported files:
         - png
         - ttf
@@ -155,50 +363,90 @@ class Manager(DebugExpandable):
 
         # clear assets in case this function was called multiple times
         self.assets = {"image": {}, "sound": {}, "font": {}}
+        self._failed_assets = set()
+        self.clear_image_cache()
+        # shared animation frames are sliced from the old images
+        # imported here, as util imports the engine
+        from util.parsers import clear_animation_bank
+        clear_animation_bank()
+
+        start_time = time.perf_counter()
+        found = self._scan_assets()
+        self._asset_index = {"image": {}, "sound": {}, "font": {}}
+        for path, asset_type, key in found:
+            self._asset_index[asset_type][key] = path
+
+        if self._asset_pack != None:
+            self._asset_pack.close()
+        self._asset_pack = AssetPack.open(pack_path) if pack_path != None else None
+        if self._asset_pack != None and self._asset_pack.scale != self._load_scale:
+            Logger.warn(f"Asset pack at {pack_path} was built with a pixel scale of {self._asset_pack.scale}, not {self._load_scale}. Ignoring it.")
+            self._asset_pack.close()
+            self._asset_pack = None
+
+        timings = {"scan": time.perf_counter()}
+        if not lazy:
+            timings.update(self._load_files(found, n_threads))
+
+        phase_start = start_time
+        for phase, phase_end in timings.items():
+            Logger.debug(f"Asset load phase [{phase}] took {round(phase_end - phase_start, 4)} seconds.")
+            phase_start = phase_end
+
+    def build_asset_pack(self, path: str, n_threads: int | None = None) -> None:
+        """Load every image from its png file, and write them to an asset pack at ``path``. Must be called after ``Manager.load``."""
+        files = [(image_path, "image", key) for key, image_path in self._asset_index["image"].items()]
+        self._load_files(files, n_threads, use_pack = False)
+        write_asset_pack(
+            path,
+            {key: (image_path, self.assets["image"][key]) for image_path, _, key in files},
+            self._load_scale
+        )
+        Logger.info(f"Built asset pack of {len(files)} images at {path}.")
+
+    def prefetch(self, prefixes: dict[str, list[str]], n_threads: int | None = None) -> None:
+        """
+        Load every asset not loaded yet whose key starts with one of the prefixes for its type.
 
-        # maps folder name to extension
-        ext_dir_map = {
-            "png": "image",
-            "ttf": "font",
-            "mp3": "sound",
-        }
-
-        for dirpath, dirnames, filenames in os.walk("assets"):
-            # go through each file
-            for filename in filenames:
-
-                fullpath = os.path.join(dirpath, filename)
-                extension = os.path.splitext(filename)[1][1:]
-                loaded_asset = None
-
-                if extension == "png":
-                    try:
-                        loaded_asset = pygame.image.load(fullpath).convert_alpha()
-                    except pygame.error as e:
-                        Logger.error(f"Could not load image file at {fullpath}.", e)
-                        loaded_asset = pygame.image.load(os.path.join(dirpath, "image", "error.png"))
-
-                    # scale asset up
-                    loaded_asset = pygame.transform.scale(
-                        loaded_asset,
-                        (
-                            loaded_asset.get_width() * self._load_scale,
-                            loaded_asset.get_height() * self._load_scale
-                        )
-                    )
-                
-                elif extension == "ttf":
-                    loaded_asset = Font(fullpath)
-
-                elif extension == "mp3" and "music" not in fullpath: # don't load music files as they will be streamed
-                    loaded_asset = pygame.mixer.Sound(fullpath)
-
-                if loaded_asset:
-                    # trim path down
-                    key = fullpath.removeprefix(os.path.join("assets", ext_dir_map[extension]) + os.sep).removesuffix(os.extsep + extension)
-                    # replace backslashes with forward
-                    key = key.replace(os.sep, "/")
-                    self.assets[ext_dir_map[extension]][key] = loaded_asset
+        e.g ``{"image": ["player/"], "sound": ["effect/coin"]}``
+        """
+        files = [
+            (path, asset_type, key)
+            for asset_type, type_prefixes in prefixes.items()
+            for key, path in self._asset_index[asset_type].items()
+            if key not in self.assets[asset_type] and key.startswith(tuple(type_prefixes))
+        ]
+        if not files: return
+
+        start_time = time.perf_counter()
+        self._load_files(files, n_threads)
+        Logger.debug(f"Prefetched {len(files)} assets in {round(time.perf_counter() - start_time, 4)} seconds.")
+
+    def get_residency_report(self) -> dict[str, dict]:
+        """
+        Returns what assets of each type are loaded, and roughly how many bytes each uses:
+        ``{type: {"indexed": n, "loaded": n, "bytes": n, "assets": {key: bytes}}}``
+        """
+        mixer_info = pygame.mixer.get_init()
+        report = {}
+        for asset_type, assets in self.assets.items():
+            sizes = {}
+            for key, asset in assets.items():
+                if asset_type == "image":
+                    sizes[key] = asset.get_pitch() * asset.get_height()
+                elif asset_type == "sound":
+                    # calculate from length, as getting the raw data would copy it
+                    frequency, size, channels = mixer_info
+                    sizes[key] = int(asset.get_length() * frequency * channels * abs(size) // 8)
+                else:
+                    sizes[key] = os.path.getsize(asset.path)
+            report[asset_type] = {
+                "indexed": len(self._asset_index[asset_type]),
+                "loaded": len(assets),
+                "bytes": sum(sizes.values()),
+                "assets": sizes,
+            }
+        return report
 
     def get_path_from_key(self, key: str, type: Literal["image", "font", "sound"]) -> str:
         type_ext_map = {
@@ -210,22 +458,107 @@ class Manager(DebugExpandable):
         return os.path.join("assets", type, *key.split("/")) + os.extsep + type_ext_map[type]
 
     def get_image(self, name: str, scale: float = 1.0) -> pygame.Surface:
+        """
+        Get the image at ``name``, resized by ``scale``.
+
+        The returned surface is shared with every other caller, so must not be drawn on or changed - copy it first.
+        Resized images are cached until they use more than ``Manager.image_cache_size`` bytes.
+        """
         try:
-            return pygame.transform.scale_by(self.assets["image"][name], scale)
+            image = self._get_asset("image", name)
         except KeyError:
             Logger.warn(f"Failed to fetch image at key {name}")
-            return self.assets["image"]["error"]
+            return self._get_asset("image", "error")
+
+        if scale == 1: return image
+        return self._get_scaled_image(name, image, scale)
+
+    def _get_scaled_image(self, name: str, image: pygame.Surface, scale: float) -> pygame.Surface:
+        key = (name, scale)
+        scaled = self._image_cache.get(key)
+        if scaled != None:
+            self.image_cache_hits += 1
+            self._image_cache.move_to_end(key)
+            return scaled
+
+        self.image_cache_misses += 1
+        scaled = pygame.transform.scale_by(image, scale)
+        self._image_cache[key] = scaled
+        self._image_cache_bytes += scaled.get_pitch() * scaled.get_height()
+
+        # remove least recently used images, always keeping the newest
+        while self._image_cache_bytes > self.image_cache_size and len(self._image_cache) > 1:
+            _, removed = self._image_cache.popitem(last = False)
+            self._image_cache_bytes -= removed.get_pitch() * removed.get_height()
+        return scaled
+
+    def clear_image_cache(self) -> None:
+        """Remove all resized images from the cache, and reset its counters"""
+        self._image_cache.clear()
+        self._image_cache_bytes = 0
+        self.image_cache_hits = 0
+        self.image_cache_misses = 0
+
+    def get_image_cache_stats(self) -> dict[str, int]:
+        """Returns the number of resized images cached, the bytes they use, and the cache hits and misses"""
+        return {
+            "images": len(self._image_cache),
+            "bytes": self._image_cache_bytes,
+            "hits": self.image_cache_hits,
+            "misses": self.image_cache_misses,
+        }
     
     def get_font(self, name: str, size: int) -> pygame.font.Font:
         try:
-            return self.assets["font"][name].get(size)
+            return self._get_asset("font", name).get(size)
         except KeyError:
             Logger.warn(f"Failed to fetch font at key {name}")
             return pygame.font.Font(None, size)
     
-    def get_sound(self, name: str) -> pygame.mixer.Sound:
-        return self.assets["sound"][name]
+    def get_sound(self, name: str) -> pygame.mixer.Sound | None:
+        """Returns the sound at ``name``, or None if it could not be loaded"""
+        return self._get_asset("sound", name)
     
+    def render_text(self, font: pygame.font.Font, text: str, colour: Colour, antialias: bool = True, shadow_colour: Colour | None = None, shadow_offset: int = 0) -> pygame.Surface:
+        """
+        Render ``text``, with a shadow ``shadow_offset`` pixels below it if ``shadow_colour`` is given.
+
+        The returned surface is shared with every other caller with the same arguments, so must not be drawn on or changed - copy it first.
+        The last ``Manager.text_cache_size`` rendered texts are cached.
+        """
+        # colours are truncated to whole numbers when drawn, so lerped colours can share surfaces
+        colour = tuple(int(c) for c in colour)
+        if shadow_colour != None:
+            shadow_colour = tuple(int(c) for c in shadow_colour)
+        key = (font, text, colour, antialias, shadow_colour, shadow_offset)
+        surface = self._text_cache.get(key)
+        if surface != None:
+            self.text_cache_hits += 1
+            self._text_cache.move_to_end(key)
+            return surface
+
+        self.text_cache_misses += 1
+        surface = font.render(text, antialias, colour)
+        if shadow_colour != None:
+            shadow = font.render(text, antialias, shadow_colour)
+            base = pygame.Surface((surface.get_width() + shadow_offset, surface.get_height() + shadow_offset), pygame.SRCALPHA)
+            base.blit(shadow, (0, shadow_offset))
+            base.blit(surface, (0, 0))
+            surface = base
+
+        self._text_cache[key] = surface
+        if len(self._text_cache) > self.text_cache_size:
+            self._text_cache.popitem(last = False)
+        return surface
+
+    def get_text_cache_stats(self) -> dict[str, int]:
+        """Returns the number of rendered texts cached, and the cache hits and misses"""
+        return {
+            "texts": len(self._text_cache),
+            "hits": self.text_cache_hits,
+            "misses": self.text_cache_misses,
+        }
+
     def play_music(self, key: str, volume: float = 1.0, fade_ms: int = 0) -> None:
         if self._current_music != key:    
             pygame.mixer.music.load(self.get_path_from_key(key, "sound"))
@@ -239,6 +572,8 @@ class Manager(DebugExpandable):
 
     def play_sound(self, sound_name: str, volume: float = 1.0, loop = False, fade_ms: int = 0) -> None:
         s = self.get_sound(sound_name)
+        # errors are logged when loading, so carry on without the sound
+        if s == None: return
         volume_multiplier = 10 * self._sfx_volume
         s.set_volume(volume * volume_multiplier)
         n_loops = -1 if loop else 0
@@ -0,0 +1,118 @@
+from __future__ import annotations
+
+import time, math
+from collections import deque
+
+_profiler_instance: Profiler = None
+
+class _NullScope:
+    # used while the profiler is disabled, so timing a scope costs almost nothing
+    def __enter__(self) -> None:
+        pass
+
+    def __exit__(self, *args) -> None:
+        pass
+
+_NULL_SCOPE = _NullScope()
+
+class _Scope:
+    __slots__ = ("profiler", "name", "start_time")
+
+    def __init__(self, profiler: Profiler, name: str) -> None:
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self) -> None:
+        self.start_time = time.perf_counter()
+
+    def __exit__(self, *args) -> None:
+        self.profiler._add_time(self.name, time.perf_counter() - self.start_time)
+
+class Profiler:
+    """
+    Records how long named scopes take each frame, keeping the last ``history_length`` frames.
+
+    Time a scope with ``with Profiler.scope("name"): ...``, and call ``Profiler.end_frame`` once a frame.
+    Scopes with the same name are added together, so a scope entered several times in one frame counts as one.
+    Does nothing until enabled with ``Profiler.set_enabled``.
+    """
+    def __init__(self, history_length: int = 240) -> None:
+        self.enabled = False
+        self.history_length = history_length
+
+        # total time of each scope in the current frame
+        self._current: dict[str, float] = {}
+        # times of each scope for previous frames
+        self._history: dict[str, deque[float]] = {}
+        self._frame_times: deque[float] = deque(maxlen = history_length)
+        self._last_frame_end: float | None = None
+
+    @staticmethod
+    def get() -> Profiler:
+        global _profiler_instance
+        if not _profiler_instance:
+            _profiler_instance = Profiler()
+        return _profiler_instance
+
+    @staticmethod
+    def set_enabled(enabled: bool, history_length: int | None = None) -> None:
+        """Enable or disable the profiler, optionally changing how many frames are kept. Clears any recorded times."""
+        profiler = Profiler.get()
+        profiler.enabled = enabled
+        if history_length != None:
+            profiler.history_length = history_length
+        profiler._current = {}
+        profiler._history = {}
+        profiler._frame_times = deque(maxlen = profiler.history_length)
+        profiler._last_frame_end = None
+
+    @staticmethod
+    def is_enabled() -> bool:
+        return Profiler.get().enabled
+
+    @staticmethod
+    def scope(name: str) -> _Scope | _NullScope:
+        """Returns a context manager that adds the time spent inside it to the scope ``name``"""
+        profiler = Profiler.get()
+        if not profiler.enabled:
+            return _NULL_SCOPE
+        return _Scope(profiler, name)
+
+    def _add_time(self, name: str, duration: float) -> None:
+        self._current[name] = self._current.get(name, 0.0) + duration
+
+    @staticmethod
+    def end_frame() -> None:
+        """Store the times of the current frame. Should be called once at the end of every frame."""
+        profiler = Profiler.get()
+        if not profiler.enabled: return
+
+        now = time.perf_counter()
+        if profiler._last_frame_end != None:
+            profiler._frame_times.append(now - profiler._last_frame_end)
+        profiler._last_frame_end = now
+
+        # scopes not entered this frame took no time
+        for name in profiler._current:
+            if name not in profiler._history:
+                profiler._history[name] = deque(maxlen = profiler.history_length)
+        for name, history in profiler._history.items():
+            history.append(profiler._current.get(name, 0.0))
+        profiler._current = {}
+
+    @staticmethod
+    def get_frame_times() -> list[float]:
+        """Returns the length of each recorded frame in seconds, oldest first"""
+        return list(Profiler.get()._frame_times)
+
+    @staticmethod
+    def get_stats() -> dict[str, tuple[float, float]]:
+        """Returns the average and 99th percentile time in seconds of the whole frame (key ``"frame"``) and each scope"""
+        profiler = Profiler.get()
+        stats = {}
+        for name, times in [("frame", profiler._frame_times), *profiler._history.items()]:
+            if len(times) == 0: continue
+            ordered = sorted(times)
+            p99 = ordered[max(math.ceil(len(ordered) * 0.99) - 1, 0)]
+            stats[name] = (sum(ordered) / len(ordered), p99)
+        return stats
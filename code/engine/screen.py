@@ -6,9 +6,12 @@ from .types import *
 from .ui import Element, Style
 
 class Screen(Node):
+    # asset key prefixes of each type to load before the screen is created, see Manager.prefetch
+    preload_assets: dict[str, list[str]] = {}
+
     def __init__(self, parent: Node) -> None:
         super().__init__(parent)
-        self.rect = parent.window.get_surface().get_rect()
+        self.rect = parent.display_surface.get_rect()
         self.master_container = self.add_child(Element(parent = self, style = Style(size = self.rect.size, alpha = 0)))
         
     def on_key_down(self, key: int, unicode: str) -> None:
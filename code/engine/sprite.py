@@ -1,7 +1,11 @@
 import pygame
 from .node import Node
+from .group import RenderGroup
 
 class Sprite(pygame.sprite.Sprite, Node):
+    # set to True in subclasses that never move once placed, so they are only sorted once when rendered
+    static = False
+
     def __init__(self, parent: Node, groups: list[str] = [], z_index: int = 0) -> None:
         Node.__init__(self, parent)
         pygame.sprite.Sprite.__init__(self)
@@ -12,6 +16,19 @@ class Sprite(pygame.sprite.Sprite, Node):
         for g in groups:
             self.add(self.manager.groups[g])
 
+    @property
+    def z_index(self) -> float:
+        return self._z_index
+
+    @z_index.setter
+    def z_index(self, value: float) -> None:
+        self._z_index = value
+        # static sprites need to be moved to their new draw position
+        if self.static:
+            for group in self.groups():
+                if isinstance(group, RenderGroup):
+                    group.refresh(self)
+
     def kill(self) -> None:
         # create shallow copy of list because it breaks without
         # for some god forsaken reason
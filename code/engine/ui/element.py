@@ -19,6 +19,9 @@ class Element(Node):
 
         self.style = style
 
+        # values passed to values_changed, by key
+        self._watched_values: dict[str, tuple] = {}
+
         self.redraw_image()
 
     def calculate_position(self) -> None:
@@ -126,6 +129,16 @@ class Element(Node):
         for child in self.children:
             child.update()
 
+    def values_changed(self, key: str, *values) -> bool:
+        """
+        Returns True if ``values`` are different from the last call with the same ``key`` (or this is the first call).
+
+        Use to only redraw when the values an image depends on change, e.g ``if self.values_changed("health", player.health): ...``
+        """
+        if self._watched_values.get(key) == values: return False
+        self._watched_values[key] = values
+        return True
+
     def add_child(self, child: T) -> T:
         c = super().add_child(child)
         if c.parent != self:
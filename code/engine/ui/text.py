@@ -18,15 +18,15 @@ class Text(Element):
         self.redraw_image()
 
     def redraw_image(self) -> None:
-        self.image = self.style.font.render(self.text, self.style.antialiasing, self.style.fore_colour)
-
-        if self.style.text_shadow:
-            base_img = pygame.Surface((self.image.get_width() + self.style.text_shadow, self.image.get_height() + self.style.text_shadow), pygame.SRCALPHA)
-            shadow_image = self.style.font.render(self.text, self.style.antialiasing, self.style.colour)
-
-            base_img.blit(shadow_image, (0, self.style.text_shadow))
-            base_img.blit(self.image, (0, 0))
-            self.image = base_img
+        # rendered text is shared between elements, so the image must not be drawn on
+        self.image = self.manager.render_text(
+            self.style.font,
+            self.text,
+            self.style.fore_colour,
+            self.style.antialiasing,
+            shadow_colour = self.style.colour if self.style.text_shadow else None,
+            shadow_offset = self.style.text_shadow
+        )
 
         self.rect = self.image.get_rect()
         self.calculate_position()
@@ -115,7 +115,7 @@ class TextBox(Element):
     def on_key_down(self, key: int, unicode: str) -> None:
         super().on_key_down(key, unicode)
         if not self.enabled or not self.focused: return
-        pressed_keys = pygame.key.get_pressed()
+        pressed_keys = self.manager.get_pressed_keys()
 
         # modifiers
         if pressed_keys[pygame.K_LCTRL]:
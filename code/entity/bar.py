@@ -8,6 +8,9 @@ class HealthBar(Sprite):
     HEALTH_BAR_WIDTH = TILE_SIZE
     HEALTH_BAR_HEIGHT = 8
 
+    # bar images shared between all health bars, keyed by size, colours, border size and filled width
+    _image_cache: dict[tuple, pygame.Surface] = {}
+
     def __init__(self, parent: Node, border_colour: Colour, border_size: int, health_colour: Colour) -> None:
         super().__init__(parent, ["render", "update"])
         self.z_index = 1
@@ -20,43 +23,59 @@ class HealthBar(Sprite):
 
         self.hidden = False
 
+        self._image_key = None
+        self.rect = pygame.Rect(0, 0, self.HEALTH_BAR_WIDTH, self.HEALTH_BAR_HEIGHT)
         self._redraw_image()
 
     def _redraw_image(self) -> None:
         max_health = self.parent.stats.health
         current_health = self.parent.health
 
-        self.image = pygame.Surface((
-            self.HEALTH_BAR_WIDTH,
-            self.HEALTH_BAR_HEIGHT
-        ))
+        # health is drawn to the nearest whole pixel, so bars with the same filled width look the same
+        fill_width = int((current_health / max_health) * (self.HEALTH_BAR_WIDTH - self.border_size * 2))
+        # size is included as subclasses can change it
+        key = (self.HEALTH_BAR_WIDTH, self.HEALTH_BAR_HEIGHT, self.border_colour, self.border_size, self.health_colour, fill_width)
+        if key == self._image_key: return
+        self._image_key = key
 
-        self.image.fill(self.border_colour)
-        
-        health_rect = pygame.Rect(
-            self.border_size,
-            self.border_size,
-            (current_health / max_health) * (self.HEALTH_BAR_WIDTH - self.border_size * 2),
-            self.HEALTH_BAR_HEIGHT - self.border_size * 2
-            )
+        image = HealthBar._image_cache.get(key)
+        if image == None:
+            image = pygame.Surface((
+                self.HEALTH_BAR_WIDTH,
+                self.HEALTH_BAR_HEIGHT
+            ))
 
-        pygame.draw.rect(self.image, self.health_colour, health_rect)
+            image.fill(self.border_colour)
 
-        self.rect = self.image.get_rect()
+            health_rect = pygame.Rect(
+                self.border_size,
+                self.border_size,
+                fill_width,
+                self.HEALTH_BAR_HEIGHT - self.border_size * 2
+                )
 
-    def update(self) -> None:
-        self._redraw_image()
+            pygame.draw.rect(image, self.health_colour, health_rect)
+            HealthBar._image_cache[key] = image
+
+        self.image = image
 
+    def _place(self) -> None:
         # render bar below parent with a little padding
         self.rect.bottom = self.parent.rect.top - self.padding
         self.rect.centerx = self.parent.rect.centerx
 
+    def update(self) -> None:
+        self._redraw_image()
+        self._place()
+
     def show(self) -> None:
         if self.hidden:
-            self.add(self.manager.groups["render"])
+            # hidden bars are not updated, so bring the bar up to date straight away
+            self.update()
+            self.add(self.manager.groups["render"], self.manager.groups["update"])
             self.hidden = False
 
     def hide(self) -> None:
         if not self.hidden:
-            self.remove(self.manager.groups["render"])
+            self.remove(self.manager.groups["render"], self.manager.groups["update"])
             self.hidden = True
@@ -2,6 +2,7 @@ from __future__ import annotations
 
 import pygame, random, math
 
+from collections import OrderedDict
 from typing import TYPE_CHECKING, Type
 
 if TYPE_CHECKING:
@@ -26,7 +27,7 @@ class EnemySpawnIndicator(Sprite):
     def __init__(self, parent: Enemy, position: Vec2 = None, spawn_time: int = 60,) -> None:
         super().__init__(parent, ["render", "update"], 0)
         self.animation_manager = self.add_child(AnimationManager(parent = self))
-        self.animation_manager.add_animation("default", util.parse_spritesheet(self.manager.get_image("enemy/spawn_warning"), frame_size=(TILE_SIZE, TILE_SIZE)))
+        self.animation_manager.add_animation("default", util.get_animation_frames(self.manager, "enemy/spawn_warning", frame_size = (TILE_SIZE, TILE_SIZE)))
         self.image = self.animation_manager.set_animation("default")
         self.rect = self.image.get_rect(center = position)
 
@@ -49,6 +50,17 @@ class Enemy(Entity):
     
     Stats are provided through Enemy.stats, and custom ai can be implemented by overriding Enemy.update_ai().
     """
+    # number of different tint strengths the damage flash fades through
+    DAMAGE_FLASH_STEPS = 6
+    DAMAGE_FLASH_ALPHA = 122
+
+    # red tinted frames shown while damaged, shared between all enemies, keyed by animation frame and tint alpha
+    # least recently used first
+    _damage_frames: OrderedDict[tuple[pygame.Surface, int], pygame.Surface] = OrderedDict()
+    # solid red silhouette of each animation frame, least recently used first
+    _damage_overlays: OrderedDict[pygame.Surface, pygame.Surface] = OrderedDict()
+    _DAMAGE_CACHE_SIZE = 256
+
     def __init__(self, parent: Room, position: Vec2, stats: EnemyStats) -> None:
         super().__init__(
             parent,
@@ -85,7 +97,7 @@ class Enemy(Entity):
         self.add(self.manager.groups["update"])
         self.add(self.manager.groups["enemy"])
 
-        screen_height = self.manager.get_window("main").size[1]
+        screen_height = self.manager.game.display_surface.get_height()
         self.target_y = self.rect.y # keep track of original spawn location
         self.rect.y -= screen_height # move entity out of screen view
         self.fall_speed = screen_height / 60 # move linearly down for 1 second
@@ -126,11 +138,8 @@ class Enemy(Entity):
     def has_line_of_sight(self, target_position: Vec2) -> bool:
         if (pygame.Vector2(target_position) - self.rect.center).magnitude() > self.stats.notice_range:
             return False
-        
-        # for blocking_sprite in self.parent.collide_sprites:
-        #     if blocking_sprite.rect.clipline(self.rect.center, target_position):
-        #         return False
-        return True
+
+        return self.parent.parent.collision_grid.has_line_of_sight(self.rect.center, target_position)
 
     def check_player_collision(self) -> None:
         if self.hitbox_active and self.collides(self.player):
@@ -160,16 +169,39 @@ class Enemy(Entity):
         if self.time_since_seen_player <= self.stats.attention_span:
             self.follow_player()
 
+    @staticmethod
+    def get_damage_frame(frame: pygame.Surface, alpha: int) -> pygame.Surface:
+        """Returns ``frame`` with a red overlay of ``alpha`` opacity. The result is shared between all enemies, so must not be changed."""
+        key = (frame, alpha)
+        damage_frame = Enemy._damage_frames.get(key)
+        if damage_frame != None:
+            Enemy._damage_frames.move_to_end(key)
+            return damage_frame
+
+        overlay = Enemy._damage_overlays.get(frame)
+        if overlay == None:
+            overlay = pygame.mask.from_surface(frame).to_surface(setcolor = (255, 0, 0), unsetcolor = None)
+            Enemy._damage_overlays[frame] = overlay
+            if len(Enemy._damage_overlays) > Enemy._DAMAGE_CACHE_SIZE:
+                Enemy._damage_overlays.popitem(last = False)
+        else:
+            Enemy._damage_overlays.move_to_end(frame)
+
+        damage_frame = frame.copy()
+        overlay.set_alpha(alpha)
+        damage_frame.blit(overlay, (0, 0))
+        Enemy._damage_frames[key] = damage_frame
+        if len(Enemy._damage_frames) > Enemy._DAMAGE_CACHE_SIZE:
+            Enemy._damage_frames.popitem(last = False)
+        return damage_frame
+
     def calculate_damage_frames(self) -> None:
         """Draw a red overlay over enemy sprite when taking damage"""
         if self.iframes > 0:
-            alpha = (self.iframes / self.stats.iframes) * 122
-
-            self.image = self.animation_manager.get_current_frame().copy()
-            mask = pygame.mask.from_surface(self.image)
-            mask = mask.to_surface(setcolor=(255, 0, 0), unsetcolor=None)
-            mask.set_alpha(alpha)
-            self.image.blit(mask, (0, 0))
+            # fade through a few tint strengths, so there are only a few different frames for each animation frame
+            step = math.ceil(self.iframes / self.stats.iframes * self.DAMAGE_FLASH_STEPS)
+            alpha = int(step / self.DAMAGE_FLASH_STEPS * self.DAMAGE_FLASH_ALPHA)
+            self.image = Enemy.get_damage_frame(self.animation_manager.get_current_frame(), alpha)
 
     def on_hit(self, other: Sprite) -> None:
         self.manager.play_sound("effect/enemy_hit", 0.5)
@@ -204,10 +236,9 @@ class Slime(Enemy):
     def __init__(self, parent: Node, position: Vec2) -> None:
         super().__init__(parent, position, enemy_stats["slime"])
 
-        rows = util.parse_spritesheet(self.manager.get_image("enemy/slime_green"), frame_count = 4, direction = "y")
         directions = ["down", "right", "up", "left"]
         for i, dir in enumerate(directions):
-            self.animation_manager.add_animation(dir, util.parse_spritesheet(rows[i], frame_count = 2))
+            self.animation_manager.add_animation(dir, util.get_animation_frames(self.manager, "enemy/slime_green", row = i, row_count = 4, frame_count = 2))
         
         self.image = self.animation_manager.set_animation(random.choice(directions))
         self.rect = self.image.get_frect(center = position)
@@ -312,7 +343,7 @@ class AttackStomp(BossAttack):
 class TreeBoss(Enemy):
     def __init__(self, parent: Node, position: Vec2) -> None:
         super().__init__(parent, position, enemy_stats["tree_boss"])
-        self.animation_manager.add_animation("fire", util.parse_spritesheet(self.manager.get_image("enemy/tree_boss"), frame_count=3))
+        self.animation_manager.add_animation("fire", util.get_animation_frames(self.manager, "enemy/tree_boss", frame_count = 3))
         self.image = self.animation_manager.set_animation("fire")
         self.rect = self.image.get_frect(center = position)
 
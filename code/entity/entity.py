@@ -2,7 +2,7 @@ from __future__ import annotations
 
 import pygame, random
 from typing import Literal
-from engine import Sprite, AnimationManager, Node
+from engine import Sprite, AnimationManager, Node, SpatialHashGroup
 from util.constants import *
 from util import polar_to_cart
 
@@ -60,35 +60,34 @@ class Entity(Sprite):
     def collides(self, other: Entity) -> bool:
         return self.hitbox.colliderect(other.hitbox)
 
-    def check_collision_vertical(self, collide_group: list[Sprite]) -> None:
+    def check_collision_vertical(self, collide_group: SpatialHashGroup) -> None:
         if self.velocity.y == 0 or not self.collision_active: return
         # get future position of hitbox
         future_collision_rect = pygame.Rect(self.rect.x, self.rect.y + self.rect.height / self.collision_box_squish, self.rect.width, self.rect.height / self.collision_box_squish)
-        for sprite in collide_group:
+        # only check sprites near the entity
+        for sprite in collide_group.query(future_collision_rect):
             if sprite == self: continue
-            if sprite.rect.colliderect(future_collision_rect):
-                # move self so that it no longer colliding
-                if self.velocity.y > 0:
-                    self.rect.bottom = sprite.rect.top
-                    return
-                elif self.velocity.y < 0:
-                    future_collision_rect.top = sprite.rect.bottom
-                    self.rect.bottom = future_collision_rect.bottom
-                    return
-
-    def check_collision_horizontal(self, collide_group: list[Sprite]) -> None:
+            # move self so that it no longer colliding
+            if self.velocity.y > 0:
+                self.rect.bottom = sprite.rect.top
+                return
+            elif self.velocity.y < 0:
+                future_collision_rect.top = sprite.rect.bottom
+                self.rect.bottom = future_collision_rect.bottom
+                return
+
+    def check_collision_horizontal(self, collide_group: SpatialHashGroup) -> None:
         if self.velocity.x == 0 or not self.collision_active: return
         # see Entity.check_collision_vertical()
         future_collision_rect = pygame.Rect(self.rect.x, self.rect.y + self.rect.height / self.collision_box_squish, self.rect.width, self.rect.height / self.collision_box_squish)
-        for sprite in collide_group:
+        for sprite in collide_group.query(future_collision_rect):
             if sprite == self: continue
-            if sprite.rect.colliderect(future_collision_rect):
-                if self.velocity.x > 0:
-                    self.rect.right = sprite.rect.left
-                    return
-                elif self.velocity.x < 0:
-                    self.rect.left = sprite.rect.right
-                    return
+            if self.velocity.x > 0:
+                self.rect.right = sprite.rect.left
+                return
+            elif self.velocity.x < 0:
+                self.rect.left = sprite.rect.right
+                return
 
     def add_velocity(self, velocity: pygame.Vector2) -> None:
         "Adds velocity to entity, i.e a force in an instant."
@@ -8,7 +8,7 @@ if TYPE_CHECKING:
 
 from engine import Node, Sprite
 from engine.types import *
-from util import parse_spritesheet, get_closest_direction, create_outline
+from util import get_animation_frames, get_closest_direction, create_outline
 from util.constants import *
 
 from item import Weapon, Spell, Sword
@@ -111,7 +111,7 @@ class InteractionOverlay(Sprite):
         if self.current_focus != None:
             self.rect.center = self.current_focus.rect.center
 
-        pressed = pygame.key.get_just_pressed()
+        pressed = self.manager.get_just_pressed_keys()
         if pressed[self.manager.keybinds["interact"]] and self.current_focus != None and self.manager.focused_window == "main":
             self.current_focus.interact()
 
@@ -152,20 +152,18 @@ class Player(Entity):
         types = ["idle", "damage", "walk", "dash"]
         directions = ["right", "left", "down", "up"]
         for type in types:
-            rows = parse_spritesheet(self.manager.get_image("player/" + type), frame_count = 4, direction = "y")
             for i, dir in enumerate(directions):
-                anim = parse_spritesheet(rows[i], frame_size = (16 * PIXEL_SCALE, 16 * PIXEL_SCALE))
+                anim = get_animation_frames(self.manager, "player/" + type, row = i, row_count = 4, frame_size = (16 * PIXEL_SCALE, 16 * PIXEL_SCALE))
                 self.animation_manager.add_animation(type + "-" + dir, anim)
 
         attack_types = ["sword_attack", "spear_attack"]
         for type in attack_types:
-            attack_rows = parse_spritesheet(self.manager.get_image("player/" + type), frame_count = 4, direction = "y")
             for i, dir in enumerate(directions):
-                anim = parse_spritesheet(attack_rows[i], frame_size = (16 * PIXEL_SCALE * 3, 16 * PIXEL_SCALE * 3))
+                anim = get_animation_frames(self.manager, "player/" + type, row = i, row_count = 4, frame_size = (16 * PIXEL_SCALE * 3, 16 * PIXEL_SCALE * 3))
                 self.animation_manager.add_animation(type + "-" + dir, anim)
 
     def get_inputs(self) -> None:
-        keys = pygame.key.get_pressed()
+        keys = self.manager.get_pressed_keys()
 
         # movement
         dv = pygame.Vector2()
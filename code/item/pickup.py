@@ -7,7 +7,7 @@ import pygame, random
 
 from engine import Sprite, AnimationManager, Node
 from engine.types import *
-from util import parse_spritesheet
+from util import get_animation_frames
 from util.constants import *
 
 class Pickup(Sprite):
@@ -35,7 +35,7 @@ class Coin(Pickup):
     def __init__(self, parent: Node, position: Vec2, randomness: int = 16) -> None:
         super().__init__(parent)
 
-        self.animation_manager.add_animation("spin", parse_spritesheet(self.manager.get_image("items/coin", 0.5), frame_count = 4))
+        self.animation_manager.add_animation("spin", get_animation_frames(self.manager, "items/coin", 0.5, frame_count = 4))
         self.image = self.animation_manager.set_animation("spin")
         self.rect = self.image.get_rect(center = (position[0] + random.randint(-randomness, randomness), position[1] + random.randint(-randomness, randomness)))
 
@@ -47,7 +47,7 @@ class Health(Pickup):
     def __init__(self, parent: Node, position: Vec2) -> None:
         super().__init__(parent)
 
-        self.animation_manager.add_animation("beat", parse_spritesheet(self.manager.get_image("items/heart"), frame_count = 4))
+        self.animation_manager.add_animation("beat", get_animation_frames(self.manager, "items/heart", frame_count = 4))
         self.image = self.animation_manager.set_animation("beat")
         self.rect = self.image.get_frect(center = position)
         self.velocity = pygame.Vector2()
@@ -71,13 +71,13 @@ class Health(Pickup):
         self.velocity -= self.velocity * SURFACE_FRICTION_COEFFICIENT * self.manager.dt
 
         self.rect.x += self.velocity.x * self.manager.dt
-        for s in self.manager.groups["collide"]:
+        for s in self.manager.groups["collide"].query(self.rect):
             if not s.rect.colliderect(self.rect): continue
             if self.velocity.x < 0: self.rect.x = s.rect.right
             elif self.velocity.x > 0: self.rect.right = s.rect.x
 
         self.rect.y += self.velocity.y * self.manager.dt
-        for s in self.manager.groups["collide"]:
+        for s in self.manager.groups["collide"].query(self.rect):
             if not s.rect.colliderect(self.rect): continue
             if self.velocity.y < 0: self.rect.y = s.rect.bottom
             elif self.velocity.y > 0: self.rect.bottom = s.rect.y
@@ -1,3 +1,5 @@
+from __future__ import annotations
+
 from typing import TYPE_CHECKING
 if TYPE_CHECKING:
     from world import FloorManager
@@ -5,7 +7,7 @@ if TYPE_CHECKING:
 
 import pygame, math
 
-from engine import Sprite, Node, AnimationManager
+from engine import Sprite, Node, AnimationManager, BroadphaseGroup
 from engine.types import Vec2
 
 class Projectile(Sprite):
@@ -14,13 +16,19 @@ class Projectile(Sprite):
     If the projectile has a pierce value, it will continue to travel after hitting `n` enemies.\n
     If adjust_rotation is `True`, the projectile will rotate to face its direction of travel, assuming the original is facing right.
     """
+    # number of different angles that images are rotated to
+    ROTATION_STEPS = 128
+
+    # rotated images shared between all projectiles, keyed by image key and rotation step
+    _rotated_images: dict[tuple[str, int], pygame.Surface] = {}
+
     def __init__(
             self,
             parent: Node,
             origin: Vec2,
             velocity: Vec2,
             damage: float,
-            enemy_group: pygame.sprite.Group,
+            enemy_group: pygame.sprite.Group | list[Entity],
             knockback: float = 0.0,
             hitbox_size: int = -1,
             image_key: str = "error",
@@ -30,9 +38,13 @@ class Projectile(Sprite):
         ) -> None:
 
         super().__init__(parent, groups = ["update", "render"])
+        self.image_key = image_key
         self.animation_manager = self.add_child(AnimationManager(self))
-        self.animation_manager.add_animation("still", [self.manager.get_image(image_key)])
-        if adjust_rotation: self.animation_manager.rotate_animation("still", -math.degrees(math.atan2(velocity[1], velocity[0])))
+        if adjust_rotation:
+            image = self.get_rotated_image(-math.degrees(math.atan2(velocity[1], velocity[0])))
+        else:
+            image = self.manager.get_image(image_key)
+        self.animation_manager.add_animation("still", [image])
         self.image = self.animation_manager.set_animation("still")
 
         self.rect = self.image.get_rect(center = origin)
@@ -52,6 +64,20 @@ class Projectile(Sprite):
 
         self.floor_manager: FloorManager = self.manager.get_object("floor-manager")
 
+    def get_rotated_image(self, angle: float) -> pygame.Surface:
+        """
+        Returns the projectile's image rotated anti-clockwise by ``angle`` degrees, rounded to one of ``ROTATION_STEPS`` angles.
+
+        The image is shared between all projectiles, so must not be changed.
+        """
+        step = round(angle / 360 * self.ROTATION_STEPS) % self.ROTATION_STEPS
+        key = (self.image_key, step)
+        image = Projectile._rotated_images.get(key)
+        if image == None:
+            image = pygame.transform.rotate(self.manager.get_image(self.image_key), step * 360 / self.ROTATION_STEPS)
+            Projectile._rotated_images[key] = image
+        return image
+
     def update(self):
         self.animation_manager.update()
         self.life -= self.manager.dt
@@ -62,7 +88,12 @@ class Projectile(Sprite):
 
         self.rect.topleft += self.velocity * self.manager.dt
         self.hitbox.center = self.rect.center
-        for enemy in self.enemy_group:
+        # use broadphase to only check nearby enemies if possible
+        if isinstance(self.enemy_group, BroadphaseGroup):
+            nearby_enemies = self.enemy_group.query_rect(self.hitbox)
+        else:
+            nearby_enemies = self.enemy_group
+        for enemy in nearby_enemies:
             if enemy.hitbox.colliderect(self.hitbox):
                 success = enemy.hit(self, damage = self.damage, kb_magnitude = self.knockback)
                 if success: self.pierce -= 1
@@ -70,8 +101,5 @@ class Projectile(Sprite):
                     self.kill()
                 return
             
-        current_room = self.floor_manager.get_room_at_world_pos(self.rect.center)
-        for tile in current_room.collide_sprites.sprites() + current_room.temp_doors.sprites():
-            if self.hitbox.colliderect(tile.rect):
-                self.kill()
-                return
\ No newline at end of file
+        if self.floor_manager.collision_grid.collides_rect(self.hitbox):
+            self.kill()
\ No newline at end of file
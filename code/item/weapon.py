@@ -75,7 +75,7 @@ class MeleeWeaponAttack(Sprite):
         self.rect = pygame.Rect(0, 0, length, width)
         self.hit_frames = hit_frames
         self.frames_alive = 0
-        self._hit_enemies = [] # keep track of hit enemies
+        self._hit_enemies = set() # keep track of hit enemies
 
         # flip hitbox if attacking up or down 
         if direction == "up" or direction == "down":
@@ -89,10 +89,10 @@ class MeleeWeaponAttack(Sprite):
         # check if hitting enemy
         player = self.manager.get_object("player")
         if player == None: return
-        for enemy in self.manager.groups["enemy"].sprites():
-            if self.rect.colliderect(enemy.hitbox) and not enemy in self._hit_enemies:
+        for enemy in self.manager.groups["enemy"].query_rect(self.rect):
+            if not enemy in self._hit_enemies:
                 enemy.hit(player, damage = self.damage, kb_magnitude = self.knockback)
-                self._hit_enemies.append(enemy)
+                self._hit_enemies.add(enemy)
 
                 player.add_health(self.damage * self.lifesteal)
 
@@ -295,18 +295,13 @@ class FireballProjectile(Projectile):
 
         self.turn_speed = 3
 
-        self.original_image = self.manager.get_image("items/fireball")
         self.awareness_r = (TILE_SIZE * 2)
 
     def update(self) -> None:
         if self.homing:
-            closest_enemy = min(
-                self.manager.groups["enemy"],
-                key = lambda enemy: (pygame.Vector2(self.rect.center) - enemy.rect.center).magnitude_squared(),
-                default = None
-            )
-            # if closest enemy is within range
-            if closest_enemy and (pygame.Vector2(self.rect.center) - closest_enemy.rect.center).magnitude() < self.awareness_r:
+            # find closest enemy within range
+            closest_enemy = self.manager.groups["enemy"].nearest(self.rect.center, self.awareness_r)
+            if closest_enemy:
                 # find vector & angle towards enemy
                 dv = pygame.Vector2(closest_enemy.rect.center) - self.rect.center
                 target_direction = -math.degrees(math.atan2(dv.y, dv.x))
@@ -316,7 +311,7 @@ class FireballProjectile(Projectile):
                     self.direction += p * self.turn_speed * self.manager.dt
 
         animation_frames = self.animation_manager.get_animation("still")
-        animation_frames[0] = pygame.transform.rotate(self.original_image, self.direction)
+        animation_frames[0] = self.get_rotated_image(self.direction)
         self.image = animation_frames[0]
         self.rect = self.image.get_rect(center = self.rect.center)
         self.velocity = util.polar_to_cart(self.direction, self.speed)
@@ -334,8 +329,8 @@ class DashSpell(Spell):
 
         def update(self) -> None:
             if self.damage:
-                for enemy in self.manager.groups["enemy"]:
-                    if self.player.hitbox.colliderect(enemy.hitbox) and not enemy in self.hit_enemies:
+                for enemy in self.manager.groups["enemy"].query_rect(self.player.hitbox):
+                    if not enemy in self.hit_enemies:
                         enemy.hit(self.player, damage = self.damage, kb_magnitude = 0)
                         self.hit_enemies.add(enemy)
 
@@ -365,7 +360,7 @@ class DashSpell(Spell):
     def attack(self) -> None:
         super().attack()
         direction = pygame.Vector2()
-        keys = pygame.key.get_pressed()
+        keys = self.manager.get_pressed_keys()
         if keys[pygame.K_d]: direction.x += 1
         if keys[pygame.K_a]: direction.x -= 1
         if keys[pygame.K_w]: direction.y -= 1
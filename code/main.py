@@ -2,14 +2,14 @@ from __future__ import annotations
 
 import os
 os.environ["PYGAME_HIDE_SUPPORT_PROMPT"] = "hide"
-working_directory = os.path.join(__file__, os.pardir, os.pardir) # set cwd as two parents from this file
+working_directory = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir) # set cwd to the project root, the parent of the folder containing this file
 os.chdir(working_directory)
 
 import sys, platform, time, datetime, json, threading
 import pygame
 
 from typing import Type
-from engine import Screen, Manager, Logger
+from engine import Screen, Manager, Logger, Profiler
 from screens import Level, Menu, SettingsScreen, GameOverviewScreen, Leaderboard
 from util import DebugWindow, SaveHelper, AutoSaver, is_valid_username
 
@@ -18,14 +18,31 @@ from util.constants import *
 
 class Game(DebugExpandable):
     # main game class that manages screens and pygame events
-    def __init__(self) -> None:
+    # if headless, no window is opened and the game is drawn to an offscreen surface - use Game.step to advance frames
+    def __init__(self, headless: bool = False) -> None:
+        self.headless = headless
+        if headless:
+            os.environ["SDL_VIDEODRIVER"] = "dummy"
+            os.environ["SDL_AUDIODRIVER"] = "dummy"
+
         pygame.init()
         
-        self.window = pygame.Window("Nature's Ascent", STARTUP_SCREEN_SIZE)
-        self.window.resizable = True
-        self.display_surface: pygame.Surface = self.window.get_surface()
+        if headless:
+            self.window = None
+            # a display mode is still needed for images to be converted
+            pygame.display.set_mode((1, 1))
+            self.display_surface = pygame.Surface(STARTUP_SCREEN_SIZE)
+        else:
+            self.window = pygame.Window("Nature's Ascent", STARTUP_SCREEN_SIZE)
+            self.window.resizable = True
+            self.display_surface: pygame.Surface = self.window.get_surface()
         self.clock = pygame.time.Clock()
 
+        # keys held down in the last Game.step call
+        self._held_keys: set[int] = set()
+        # keys pressed since the last tick
+        self._keys_pressed: set[int] = set()
+
         self._window_mode: WindowMode = "windowed"
 
         self.running = True
@@ -33,13 +50,16 @@ class Game(DebugExpandable):
         self.manager = Manager(self, fps = FPS, num_channels = 32)
         self.manager.set_pixel_scale(PIXEL_SCALE)
         a = time.perf_counter()
-        self.manager.load()
+        # only load assets when they are needed, if specified
+        self.manager.load(lazy = "-lazy" in sys.argv, pack_path = ASSET_PACK_PATH)
         b = time.perf_counter()
 
-        self.window.set_icon(self.manager.get_image("menu/tree"))
+        if not headless:
+            self.window.set_icon(self.manager.get_image("menu/tree"))
         self.manager.add_window(self.window, "main")
 
-        if IN_DEBUG:
+        self.use_debug_window = IN_DEBUG and not headless
+        if self.use_debug_window:
             self.debug_window = DebugWindow(self)
             self.manager.add_window(self.debug_window.window, "debug")
 
@@ -122,6 +142,7 @@ class Game(DebugExpandable):
             "sfx-vol": self.manager.sfx_volume,
             "music-vol": self.manager.music_volume,
             "username": self.username,
+            "max-fps": self.manager.fps,
             "keybinds": self.manager.keybinds
         }
         return json.dumps(config, indent=4)
@@ -132,6 +153,7 @@ class Game(DebugExpandable):
             "sfx-vol": 0.1,
             "music-vol": 0.1,
             "username": "",
+            "max-fps": FPS,
             "keybinds": {
                 "move-up": pygame.K_w,
                 "move-left": pygame.K_a,
@@ -176,7 +198,7 @@ class Game(DebugExpandable):
 
         try:
             window_mode: WindowMode = config["window-mode"]
-            if window_mode != self._window_mode:
+            if window_mode != self._window_mode and not self.headless:
                 match window_mode:
                     case "windowed":
                         self.set_windowed(STARTUP_SCREEN_SIZE)
@@ -197,6 +219,15 @@ class Game(DebugExpandable):
         except Exception as e:
             Logger.warn(f"Could not load config option [username]. Defaulting to value {default_config['username']} ({e})")
 
+        try:
+            cfg_option = config["max-fps"]
+            if not isinstance(cfg_option, int): raise TypeError("Config option 'max-fps' must be of type 'int'")
+            # 0 means no limit
+            if cfg_option < 0: raise ValueError(f"Value out of bounds: {cfg_option}")
+            self.manager.fps = cfg_option
+        except Exception as e:
+            Logger.warn(f"Could not load config option [max-fps]. Defaulting to value {default_config['max-fps']} ({e})")
+
         try:
             cfg_option = config["keybinds"]
             for key in default_config["keybinds"].keys():
@@ -218,76 +249,150 @@ class Game(DebugExpandable):
 
     def run(self) -> None:
         # main loop
+        # the game is updated in ticks of fixed length, and any time left over is carried to the next frame
+        tick_time = 1 / TICK_RATE
+        accumulator = 0.0
         while self.running:
-            # maintain constant fps
+            # limit frame rate
             self.clock.tick(self.manager.fps)
-            # calculate dt
-            self.manager.update_dt()
-
-            # change screen if needed
-            if self._next_screen:
-                self.manager.cleanup()
-                self.current_screen = self._next_screen
-                self.current_screen_instance = self._screens[self._next_screen](self, **self._next_screen_kwargs)
-                self._next_screen = ""
-                self._next_screen_kwargs = {}
-
-            # poll events
-            for event in pygame.event.get():
-                screen_instance: Screen = self.current_screen_instance
-
-                # send events to debug window if focused
-                window = getattr(event, "window", None)
-                if IN_DEBUG and window == self.manager.get_window("debug"):
-                    screen_instance = self.debug_window
-
-                if event.type == pygame.WINDOWCLOSE:
-                    if IN_DEBUG:
-                        self.debug_window.kill()
-                    self.queue_close()
-
-                elif event.type == pygame.WINDOWFOCUSGAINED:
-                    self.manager.focused_window = "main" if event.window == self.window else "debug"
+            accumulator += self.clock.get_time() / 1000
 
-                elif event.type == pygame.MOUSEMOTION:
-                    # ------------------------------------- vvvvvv little hack to get key from a value in a dict
-                    self.manager.on_mouse_motion(event.pos, list(self.manager.windows.keys())[list(self.manager.windows.values()).index(event.window)])
+            with Profiler.scope("events"):
+                self.handle_events()
 
-                # delegate certain events to current screen
-                elif event.type == pygame.KEYDOWN:
-                    screen_instance.on_key_down(event.key, event.unicode)
-
-                elif event.type == pygame.MOUSEBUTTONDOWN:
-                    screen_instance.on_mouse_down(event.button)
-
-                elif event.type == pygame.MOUSEBUTTONUP:
-                    screen_instance.on_mouse_up(event.button)
-
-                elif event.type == pygame.MOUSEWHEEL:
-                    screen_instance.on_scroll(event.x, event.y)
-
-                elif event.type == pygame.WINDOWRESIZED:
-                    screen_instance.on_resize((event.x, event.y))
-
-            # reset cursor image
-            self.manager.set_cursor(pygame.SYSTEM_CURSOR_ARROW)
-
-            # update screen instance
-            self.current_screen_instance.update()
-            self.update_save()
-
-            if IN_DEBUG and not self.debug_window.dead:
-                self.debug_window.update()
+            ticks = 0
+            while accumulator >= tick_time:
+                # if too far behind, drop the time instead of trying to catch up
+                if ticks == MAX_TICKS_PER_FRAME:
+                    accumulator = 0.0
+                    break
+                self.tick(tick_time)
+                accumulator -= tick_time
+                ticks += 1
 
             # call os to change cursor
-            self.manager.load_cursor()
-
-            # clear the window
-            self.display_surface.fill((0, 0, 0))
-            # draw screen to window
-            self.current_screen_instance.render(self.display_surface)
-            self.window.flip()
-
+            if not self.headless:
+                self.manager.load_cursor()
+
+            # draw sprites part way between their last two positions, depending on the time left over
+            self.manager.interpolation = accumulator / tick_time
+            self.draw()
+            if not self.headless:
+                with Profiler.scope("flip"):
+                    self.window.flip()
+
+            Profiler.end_frame()
+
+        self.quit()
+
+    def step(self, n_frames: int = 1, held_keys: set[int] = set(), events: list[pygame.Event] = []) -> None:
+        """
+        Advance the game by ``n_frames`` frames of one tick each, without waiting for the clock or drawing to a window.
+
+        ``held_keys`` are the keys held down for all the frames, and ``events`` are posted before the first frame.
+        Keys that were not held during the last call are sent as key down events, and keys no longer held as key up events.
+        """
+        held_keys = set(held_keys)
+        for key in held_keys - self._held_keys:
+            pygame.event.post(pygame.Event(pygame.KEYDOWN, key = key, unicode = ""))
+        for key in self._held_keys - held_keys:
+            pygame.event.post(pygame.Event(pygame.KEYUP, key = key, unicode = ""))
+        for event in events:
+            pygame.event.post(event)
+
+        self._held_keys = held_keys
+        self.manager.inject_keys(held_keys)
+        self.manager.interpolation = 1.0
+
+        for i in range(n_frames):
+            if not self.running: break
+            self.clock.tick()
+            with Profiler.scope("events"):
+                self.handle_events()
+            self.tick(1 / TICK_RATE)
+            self.draw()
+            Profiler.end_frame()
+
+    def _change_screen(self) -> None:
+        if self._next_screen:
+            self.manager.prefetch(self._screens[self._next_screen].preload_assets)
+            self.manager.cleanup()
+            self.current_screen = self._next_screen
+            self.current_screen_instance = self._screens[self._next_screen](self, **self._next_screen_kwargs)
+            self._next_screen = ""
+            self._next_screen_kwargs = {}
+
+    def handle_events(self) -> None:
+        """Poll pygame events and send them to the current screen"""
+        # change screen if needed
+        self._change_screen()
+
+        for event in pygame.event.get():
+            screen_instance: Screen = self.current_screen_instance
+
+            # send events to debug window if focused
+            window = getattr(event, "window", None)
+            if self.use_debug_window and window == self.manager.get_window("debug"):
+                screen_instance = self.debug_window
+
+            if event.type == pygame.WINDOWCLOSE:
+                if self.use_debug_window:
+                    self.debug_window.kill()
+                self.queue_close()
+
+            elif event.type == pygame.WINDOWFOCUSGAINED:
+                self.manager.focused_window = "main" if event.window == self.window else "debug"
+
+            elif event.type == pygame.MOUSEMOTION:
+                # ------------------------------------- vvvvvv little hack to get key from a value in a dict
+                self.manager.on_mouse_motion(event.pos, list(self.manager.windows.keys())[list(self.manager.windows.values()).index(window)])
+
+            # delegate certain events to current screen
+            elif event.type == pygame.KEYDOWN:
+                # store key presses until the next tick, so they are not missed or repeated
+                self._keys_pressed.add(event.key)
+                screen_instance.on_key_down(event.key, event.unicode)
+
+            elif event.type == pygame.MOUSEBUTTONDOWN:
+                screen_instance.on_mouse_down(event.button)
+
+            elif event.type == pygame.MOUSEBUTTONUP:
+                screen_instance.on_mouse_up(event.button)
+
+            elif event.type == pygame.MOUSEWHEEL:
+                screen_instance.on_scroll(event.x, event.y)
+
+            elif event.type == pygame.WINDOWRESIZED:
+                screen_instance.on_resize((event.x, event.y))
+
+    def tick(self, tick_time: float) -> None:
+        """Update the current screen by ``tick_time`` seconds"""
+        # change screen if needed
+        self._change_screen()
+
+        self.manager.update_dt(tick_time)
+        self.manager.set_just_pressed(self._keys_pressed)
+        self._keys_pressed = set()
+
+        # reset cursor image
+        self.manager.set_cursor(pygame.SYSTEM_CURSOR_ARROW)
+
+        # update screen instance
+        self.current_screen_instance.update()
+        self.update_save()
+
+    def draw(self) -> None:
+        """Draw the current screen to the display surface"""
+        if self.use_debug_window and not self.debug_window.dead:
+            self.debug_window.update()
+
+        # clear the window
+        self.display_surface.fill((0, 0, 0))
+        # draw screen to window
+        self.current_screen_instance.render(self.display_surface)
+
+    def quit(self) -> None:
+        """Save settings and close pygame, once all threads have finished"""
         self.settings_saver.force_save()
         # wait for threads to terminate
         main_thread = threading.main_thread()
@@ -343,6 +448,13 @@ def main() -> None:
     # get some system debug info
     if not log_to_console: log_system_specs()
 
+    # build the asset pack instead of playing
+    if "-pack-assets" in sys.argv:
+        game = Game(headless = True)
+        game.manager.build_asset_pack(ASSET_PACK_PATH)
+        pygame.quit()
+        return
+
     # main entry point
     game = Game()
     game.run()
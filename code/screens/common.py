@@ -109,7 +109,7 @@ class IconText(Element):
         )
         self.rect = self.image.get_rect()
 
-        text_surf = self.style.font.render(self.text, False, self.style.fore_colour)
+        text_surf = self.manager.render_text(self.style.font, self.text, self.style.fore_colour, False)
 
         if self.icon_alignment == "left":
             icon_rect = self.icon.get_rect(centery = self.rect.height / 2, x = 0)
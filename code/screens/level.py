@@ -5,13 +5,13 @@ if TYPE_CHECKING:
     from ..main import Game
 
 import pygame
-import random, pickle, os
+import random, pickle, os, bisect
 
-from engine import Screen, Sprite, Node, ui, Logger
+from engine import Screen, Sprite, Node, ui, Logger, Profiler, RenderGroup, SpatialHashGroup, BroadphaseGroup
 from engine.types import *
 from entity import Player, HealthBar
 from item import MeleeWeaponAttack, ItemPool, Coin, Health
-from world import FloorManager, Tile, Room, WorldItem, Chest, ItemChest, PickupChest
+from world import FloorManager, WallCollider, TileMap, Room, WorldItem, Chest, ItemChest, PickupChest
 from util import SaveHelper, AutoSaver, parse_spritesheet
 from util.constants import *
 
@@ -48,6 +48,8 @@ class HealthBarUI(ui.Element):
         self.player = self.manager.get_object("player")
 
     def update(self) -> None:
+        if not self.values_changed("health", self.player.health, self.player.stats.health): return
+
         self.image = pygame.Surface(self.image.get_size(), pygame.SRCALPHA)
         border_rect = self.image.get_rect()
         
@@ -93,6 +95,16 @@ class MapUI(ui.Element):
 
         self.spawn_icon, self.boss_icon, self.done_icon, self.player_icon, self.upgrade_icon = parse_spritesheet(self.manager.get_image("map/icons", 0.5), assume_square=True)
 
+        self.map_surf = pygame.Surface((self.style.size[0] - self.border_size * 2, self.style.size[1] - self.border_size * 2))
+        self._frame_image: pygame.Surface | None = None
+
+        # floor_manager.room_state_version the last time the rooms were drawn
+        self._room_state_version: int | None = None
+        # order of each room in floor_manager.rooms
+        self._room_order: dict[Vec2, int] = {}
+        # all rooms drawn at each scale, with the map position of the top left of the surface relative to room (0, 0)
+        self._room_layers: dict[float, tuple[pygame.Surface, pygame.Vector2]] = {}
+
         self.update_map()
 
         self.explored_text = self.add_child(IconText(
@@ -132,23 +144,30 @@ class MapUI(ui.Element):
             return self.done_icon
         return pygame.Surface((0, 0))
 
-    def update_map(self) -> None:
-        self.map_surf = pygame.Surface((self.style.size[0] - self.border_size * 2, self.style.size[1] - self.border_size * 2))
-        self.map_surf.fill(self.background_colour)
-
-        player_pos = (0, 0)
-
-        for room_coord, room in self.floor_manager.rooms.items():
+    def _draw_room_layer(self) -> tuple[pygame.Surface, pygame.Vector2]:
+        """Draw every room and connection at the current scale, not moved by the player position"""
+        step = self.scale + self.scale / 4
+        rooms = self.floor_manager.rooms
+        min_x = min(coord[0] for coord in rooms)
+        min_y = min(coord[1] for coord in rooms)
+        max_x = max(coord[0] for coord in rooms)
+        max_y = max(coord[1] for coord in rooms)
+
+        # leave space for connections and icons which go outside of the room
+        padding = max(self.scale, *(icon.get_width() for icon in (self.spawn_icon, self.boss_icon, self.done_icon, self.upgrade_icon)))
+        origin = pygame.Vector2(min_x * step - padding, min_y * step - padding)
+        layer = pygame.Surface(((max_x - min_x) * step + self.scale + padding * 2, (max_y - min_y) * step + self.scale + padding * 2))
+        layer.fill(self.background_colour)
+
+        for room_coord, room in rooms.items():
             # draw room
-            scaled_coord = self.scale_room_to_map(room_coord)
-
-            room_rect = pygame.Rect(*scaled_coord, self.scale, self.scale)
+            room_rect = pygame.Rect(*(pygame.Vector2(room_coord) * step - origin), self.scale, self.scale)
 
             colour = self._get_room_colour(room)
-            pygame.draw.rect(self.map_surf, colour, room_rect)
+            pygame.draw.rect(layer, colour, room_rect)
 
             icon = self._get_room_icon(room)
-            self.map_surf.blit(icon, icon.get_rect(center = room_rect.center))
+            layer.blit(icon, icon.get_rect(center = room_rect.center))
 
             # draw connections
             for connection in room.connections:
@@ -166,12 +185,43 @@ class MapUI(ui.Element):
                     con_rect.top = room_rect.bottom
                     con_rect.centerx = room_rect.centerx
 
-                pygame.draw.rect(self.map_surf, colour, con_rect)
+                pygame.draw.rect(layer, colour, con_rect)
+
+        return layer, origin
 
-            if room.bounding_rect.colliderect(self.player.rect):
-                rel = (pygame.Vector2(self.player.rect.center) - pygame.Vector2(room.bounding_rect.topleft)) / (self.floor_manager.room_size * TILE_SIZE) * self.scale
-                player_pos = rel + scaled_coord
+    def _get_player_map_position(self) -> Vec2:
+        # only the rooms around the player's room can touch the player
+        player_room = pygame.Vector2(self.player.rect.center) / TILE_SIZE // self.floor_manager.room_size
+        touching = []
+        for dx in (-1, 0, 1):
+            for dy in (-1, 0, 1):
+                room_coord = (int(player_room.x) + dx, int(player_room.y) + dy)
+                room = self.floor_manager.rooms.get(room_coord)
+                if room != None and room.bounding_rect.colliderect(self.player.rect):
+                    touching.append(room_coord)
 
+        if not touching: return (0, 0)
+        # use the last room in the floor, if touching more than one
+        room_coord = max(touching, key = self._room_order.__getitem__)
+        room = self.floor_manager.rooms[room_coord]
+        rel = (pygame.Vector2(self.player.rect.center) - pygame.Vector2(room.bounding_rect.topleft)) / (self.floor_manager.room_size * TILE_SIZE) * self.scale
+        return rel + self.scale_room_to_map(room_coord)
+
+    def update_map(self) -> None:
+        # rooms only need redrawing when one is activated or cleared
+        if self.floor_manager.room_state_version != self._room_state_version:
+            self._room_state_version = self.floor_manager.room_state_version
+            self._room_order = {room_coord: i for i, room_coord in enumerate(self.floor_manager.rooms)}
+            self._room_layers = {}
+
+        if self.scale not in self._room_layers:
+            self._room_layers[self.scale] = self._draw_room_layer()
+        layer, origin = self._room_layers[self.scale]
+
+        self.map_surf.fill(self.background_colour)
+        self.map_surf.blit(layer, self.scale_room_to_map((0, 0)) + origin)
+
+        player_pos = self._get_player_map_position()
         self.map_surf.blit(self.player_icon, self.player_icon.get_rect(center = player_pos))
 
     def increase_scale(self) -> None:
@@ -186,16 +236,19 @@ class MapUI(ui.Element):
 
     def update(self) -> None:
         super().update()
-        self.image = pygame.Surface(self.style.size, pygame.SRCALPHA)
         self.update_map()
-        # draw borders
-        pygame.draw.rect(self.image, self.border_colour, [0, 0, *self.style.size], border_radius = 4)
-        self.image.blit(self.map_surf, (self.border_size, self.border_size))
+        if self._frame_image == None:
+            # map covers everything inside the border, so the border only needs drawing once
+            self._frame_image = pygame.Surface(self.style.size, pygame.SRCALPHA)
+            pygame.draw.rect(self._frame_image, self.border_colour, [0, 0, *self.style.size], border_radius = 4)
+        self._frame_image.blit(self.map_surf, (self.border_size, self.border_size))
+        self.image = self._frame_image
         self.style.image = self.image
 
         # explored text
         rooms_completed, total_rooms = self.floor_manager.get_completion_status()
-        self.explored_text.set_text(f"{rooms_completed}/{total_rooms}")
+        if self.values_changed("explored", rooms_completed, total_rooms):
+            self.explored_text.set_text(f"{rooms_completed}/{total_rooms}")
 
 class InventoryUI(ui.Element):
     def __init__(self, parent: ui.Element) -> None:
@@ -300,13 +353,14 @@ class InventoryUI(ui.Element):
             self.spell_slot.style.image = self._draw_slot_image(self.spell_size, *cur_s_state)
             self.spell_slot.redraw_image()
 
-        # calculate cooldown progress
+        # calculate cooldown progress, in whole pixels so it is only redrawn when the bar changes size
         if cur_s_state[0] != "": 
-            height = self.player.spell_cd / self.player.inventory.spell.cooldown_time * (self.spell_size - 2 * self.border)
+            height = int(self.player.spell_cd / self.player.inventory.spell.cooldown_time * (self.spell_size - 2 * self.border))
         else:
             height = 0
-        self.spell_cd_overlay.style.size = (self.spell_size - 2 * self.border, height)
-        self.spell_cd_overlay.redraw_image()
+        if self.values_changed("cooldown", height):
+            self.spell_cd_overlay.style.size = (self.spell_size - 2 * self.border, height)
+            self.spell_cd_overlay.redraw_image()
 
 class HudUI(ui.Element):
     def __init__(self, parent: Node) -> None:
@@ -356,7 +410,8 @@ class HudUI(ui.Element):
     def update(self) -> None:
         super().update()
         # coin text
-        self.coin_text.set_text(f"{self.player.inventory.coins:,}")
+        if self.values_changed("coins", self.player.inventory.coins):
+            self.coin_text.set_text(f"{self.player.inventory.coins:,}")
 
 class PauseUI(ui.Element):
     def __init__(self, parent: Level) -> None:
@@ -598,7 +653,65 @@ class LevelSaver(AutoSaver):
             self._data_update_counter = 0
         super().update()
 
+class ProfilerOverlay(Node):
+    """Draws a graph of recent frame times, and the average and 99th percentile time of each profiled scope."""
+    def __init__(self, parent: Node, graph_size: Vec2 = (240, 80), text_refresh_time: int = 15) -> None:
+        super().__init__(parent)
+        self.graph_size = graph_size
+        self.text_refresh_time = text_refresh_time
+        self._refresh_counter = 0
+        self.font = self.manager.get_font("alagard", 16)
+        self.text_image: pygame.Surface = None
+
+    def _redraw_text(self) -> None:
+        lines = [
+            self.font.render(f"{name}: {avg * 1000:.2f} ms avg, {p99 * 1000:.2f} ms p99", False, TEXT_WHITE)
+            for name, (avg, p99) in Profiler.get_stats().items()
+        ]
+        height = sum(line.get_height() for line in lines)
+        width = max((line.get_width() for line in lines), default = 0)
+
+        self.text_image = pygame.Surface((max(width, 1), max(height, 1)), pygame.SRCALPHA)
+        y = 0
+        for line in lines:
+            self.text_image.blit(line, (0, y))
+            y += line.get_height()
+
+    def render(self, surface: pygame.Surface) -> None:
+        # only remake text every few frames as it is slow to render
+        self._refresh_counter -= 1
+        if self._refresh_counter <= 0 or self.text_image == None:
+            self._redraw_text()
+            self._refresh_counter = self.text_refresh_time
+
+        padding = 8
+        panel = pygame.Rect(0, 0, max(self.graph_size[0], self.text_image.get_width()) + padding * 2, self.graph_size[1] + self.text_image.get_height() + padding * 3)
+        panel.bottomleft = (0, surface.get_height())
+        pygame.draw.rect(surface, BG_DARKNAVY, panel)
+
+        # draw frame times as a graph, where the red line is the time of one frame at the target fps
+        graph = pygame.Rect(panel.x + padding, panel.y + padding, *self.graph_size)
+        pygame.draw.rect(surface, BG_NAVY, graph)
+        budget = 1 / self.manager.fps
+        max_time = budget * 2
+        frame_times = Profiler.get_frame_times()[-graph.width:]
+        if len(frame_times) > 1:
+            points = [
+                (graph.right - len(frame_times) + i, graph.bottom - min(t / max_time, 1) * graph.height)
+                for i, t in enumerate(frame_times)
+            ]
+            pygame.draw.lines(surface, PLAYER_GREEN, False, points)
+        budget_y = graph.bottom - budget / max_time * graph.height
+        pygame.draw.line(surface, ENEMY_RED, (graph.left, budget_y), (graph.right, budget_y))
+
+        surface.blit(self.text_image, (graph.left, graph.bottom + padding))
+
 class Level(Screen):
+    preload_assets = {
+        "image": ["player/", "enemy/", "items/", "map/", "world/"],
+        "sound": ["effect/"],
+    }
+
     def __init__(self, game: Game, load_from_file: bool = False) -> None:
         super().__init__(parent = game)
 
@@ -610,7 +723,10 @@ class Level(Screen):
 
         self.game_surface = pygame.Surface(self.rect.size)
 
-        self.manager.add_groups(["render", "update", "collide", "enemy", "interact"])
+        self.manager.add_groups(["update", "interact"])
+        self.manager.add_groups(["render"], RenderGroup)
+        self.manager.add_groups(["collide"], SpatialHashGroup)
+        self.manager.add_groups(["enemy"], BroadphaseGroup)
         self.manager.add_object("level", self)
 
         self.item_pool = self.add_child(ItemPool(self))
@@ -620,6 +736,8 @@ class Level(Screen):
         self.camera = self.add_child(FollowCameraLayered(self, target_sprite = self.player, follow_speed = 0.1))
 
         self.debug_mode = 0
+        self.show_profiler = False
+        self.profiler_overlay = ProfilerOverlay(self)
         self.paused = False
 
         self.time_in_run = 0
@@ -736,6 +854,12 @@ class Level(Screen):
         if self.debug_mode > 3:
             self.debug_mode = 0
 
+    def toggle_profiler(self) -> None:
+        """Toggles the profiler, and the overlay showing frame times."""
+        if not IN_DEBUG: return
+        self.show_profiler = not self.show_profiler
+        Profiler.set_enabled(self.show_profiler)
+
     def toggle_pause(self) -> None:
         self.paused = not self.paused
         self.pause_ui.toggle(self.game_surface)
@@ -757,6 +881,9 @@ class Level(Screen):
         elif key == pygame.K_F3 and IN_DEBUG:
             self.cycle_debug()
 
+        elif key == pygame.K_F4 and IN_DEBUG:
+            self.toggle_profiler()
+
     def on_resize(self, new_res: Vec2) -> None:
         super().on_resize(new_res)
         # remake game surface to new size
@@ -798,6 +925,9 @@ class Level(Screen):
     def debug(self) -> None:
         if self.debug_mode == 0: return
 
+        render_group = self.manager.groups["render"]
+        interpolation = self.manager.interpolation
+
         # render hitboxes of anything that has a rect
         for item in self.get_all_children():
             if not hasattr(item, "rect") or item.rect == None: continue
@@ -806,28 +936,32 @@ class Level(Screen):
             # ignore specific elements
             if isinstance(item, (ui.Element, HealthBar)): continue
 
+            # draw boxes where the sprite is drawn, between its last two positions
+            draw_offset = pygame.Vector2(render_group.get_draw_position(item, interpolation)) - item.rect.topleft
+
             # draw z indexes on debug 3
             if self.debug_mode == 3 and hasattr(item, "z_index"):
-                text_pos = self.camera.convert_coords(pygame.Vector2(item.rect.center))
+                text_pos = self.camera.convert_coords(pygame.Vector2(item.rect.center) + draw_offset)
                 if self.rect.collidepoint(text_pos):
                     z_text = self.manager.get_font("alagard", 16).render(str(item.z_index), False, GREEN)
                     self.game_surface.blit(z_text, z_text.get_rect(center = text_pos))
 
-            # ignore tiles unless on debug 2
-            if isinstance(item, Tile) and self.debug_mode != 2: continue
+            # ignore walls unless on debug 2
+            if isinstance(item, WallCollider) and self.debug_mode != 2: continue
 
             # draw active damage hitboxes
             outline_colour = RED if isinstance(item, MeleeWeaponAttack) and item.in_hit_frames() else BLUE
 
             # draw collision boxes
-            pygame.draw.rect(self.game_surface, outline_colour, self.camera.convert_rect(item.rect), width = 1)
+            pygame.draw.rect(self.game_surface, outline_colour, self.camera.convert_rect(item.rect.move(draw_offset)), width = 1)
             # draw hitboxes
             if hasattr(item, "hitbox"):
-                pygame.draw.rect(self.game_surface, RED, self.camera.convert_rect(item.hitbox), width = 1)
+                pygame.draw.rect(self.game_surface, RED, self.camera.convert_rect(item.hitbox.move(draw_offset)), width = 1)
             # draw facing directions
             if hasattr(item, "direction") and isinstance(item.direction, float):
-                end = item.rect.center + pygame.Vector2(32, 0).rotate(-item.direction)
-                pygame.draw.line(self.game_surface, RED, self.camera.convert_coords(item.rect.center), self.camera.convert_coords(end), 1)
+                start = item.rect.center + draw_offset
+                end = start + pygame.Vector2(32, 0).rotate(-item.direction)
+                pygame.draw.line(self.game_surface, RED, self.camera.convert_coords(start), self.camera.convert_coords(end), 1)
 
         # and also draw room rects
         if self.debug_mode == 2:
@@ -836,17 +970,27 @@ class Level(Screen):
                 pygame.draw.rect(self.game_surface, GREEN, self.camera.convert_rect(room.inside_rect), 3)
 
     def update(self) -> None:
+        # store positions to draw between. also done while paused, so nothing is drawn between stale positions
+        self.manager.groups["render"].store_positions()
+        self.camera.store_position()
+
         # check for pause override
         if self.paused:
             self.pause_ui.update()
             return
-        
+
+        # index enemy positions for this frame's hit checks
+        self.manager.groups["enemy"].rebuild()
+
         # update all sprites in update group
-        self.manager.groups["update"].update()
+        with Profiler.scope("update"):
+            self.manager.groups["update"].update()
         self.master_ui.update()
-        self.floor_manager.update()
+        with Profiler.scope("floor"):
+            self.floor_manager.update()
 
-        self.run_saver.update()
+        with Profiler.scope("save"):
+            self.run_saver.update()
 
         # add run time
         self.time_in_run += self.manager.dt / 60
@@ -856,16 +1000,22 @@ class Level(Screen):
         self.game_surface.fill(UI_DARKBROWN)
 
         # render objects with layered camera
-        self.camera.render(
-            surface = self.game_surface,
-            sprite_group = self.manager.groups["render"]
-        )
+        with Profiler.scope("camera render"):
+            self.camera.render(
+                surface = self.game_surface,
+                sprite_group = self.manager.groups["render"],
+                tile_maps = [self.floor_manager.floor_map, self.floor_manager.wall_map]
+            )
 
         # draw debug elements
         self.debug()
 
         # render GUI elements
-        self.master_ui.render(self.game_surface)
+        with Profiler.scope("ui render"):
+            self.master_ui.render(self.game_surface)
+
+        if self.show_profiler:
+            self.profiler_overlay.render(self.game_surface)
 
         # render pause ui
         if self.paused:
@@ -881,6 +1031,7 @@ class FollowCameraLayered(Sprite):
 
         self.target = target_sprite
         self.pos = pygame.Vector2(target_sprite.rect.center)
+        self.previous_pos = self.pos.copy()
         self.follow_speed = follow_speed
         self.tolerence = tolerence
 
@@ -900,16 +1051,18 @@ class FollowCameraLayered(Sprite):
             self.shake_timer -= self.manager.dt
             self.pos += pygame.Vector2(random.randrange(-self.shake_intensity, self.shake_intensity), random.randrange(-self.shake_intensity, self.shake_intensity))
 
+    def store_position(self) -> None:
+        """Remember the current position to draw between. Should be called before every update."""
+        self.previous_pos = self.pos.copy()
+
     def set_screen_size(self, new_size: Vec2) -> None:
         """Set new screen size to center camera on"""
+        self.screen_size = (new_size[0], new_size[1])
         self.half_screen_size = pygame.Vector2(new_size[0] // 2, new_size[1] // 2)
 
     def convert_coords(self, old_coords: Vec2) -> pygame.Vector2:
-        """Converts absolute world coords to scaled coords on screen"""
-        return pygame.Vector2(
-            old_coords[0] - (int(self.pos.x) - self.half_screen_size.x),
-            old_coords[1] - (int(self.pos.y) - self.half_screen_size.y)
-        )
+        """Converts absolute world coords to scaled coords on screen, where they were drawn in the last render"""
+        return pygame.Vector2(old_coords[0] - self.offset.x, old_coords[1] - self.offset.y)
     
     def convert_rect(self, rect: pygame.Rect | pygame.FRect) -> pygame.Rect | pygame.FRect:
         """See convert_coords"""
@@ -922,13 +1075,46 @@ class FollowCameraLayered(Sprite):
         self.shake_intensity = intensity
         self.shake_timer = duration
 
-    def render(self, surface: pygame.Surface, sprite_group: pygame.sprite.Group) -> None:
-        # render sprites centered on camera position
-        self.offset.x = int(self.pos.x) - self.half_screen_size.x
-        self.offset.y = int(self.pos.y) - self.half_screen_size.y
+    def get_view_rect(self) -> pygame.Rect:
+        """Returns the area of the world currently visible to the camera, in world coords"""
+        return pygame.Rect(self.offset, self.screen_size)
+
+    def cull(self, sprites: list[Sprite], positions: list[Vec2]) -> list[tuple[Sprite, Vec2]]:
+        """Returns only the sprites (with their positions) whose image would be drawn inside the camera view"""
+        view_rect = self.get_view_rect()
+        return [
+            (s, pos) for s, pos in zip(sprites, positions)
+            if view_rect.colliderect(pos[0] + s.render_offset[0], pos[1] + s.render_offset[1], s.image.get_width(), s.image.get_height())
+        ]
 
-        # render sprites sorted in y position and z index
+    def _blit_sprites(self, surface: pygame.Surface, sprites: list[tuple[Sprite, Vec2]]) -> None:
         surface.blits(
-            (s.image, (s.rect.x - self.offset.x + s.render_offset[0], s.rect.y - self.offset.y + s.render_offset[1]))
-            for s in sorted(sprite_group.sprites(), key = lambda x: (x.z_index, x.rect.centery))
-        )
\ No newline at end of file
+            (s.image, (pos[0] - self.offset.x + s.render_offset[0], pos[1] - self.offset.y + s.render_offset[1]))
+            for s, pos in sprites
+        )
+
+    def render(self, surface: pygame.Surface, sprite_group: RenderGroup, tile_maps: list[TileMap] = []) -> None:
+        interpolation = self.manager.interpolation
+
+        # render sprites centered on camera position, between its last two positions
+        pos = self.previous_pos.lerp(self.pos, interpolation) if interpolation < 1 else self.pos
+        self.offset.x = int(pos.x) - self.half_screen_size.x
+        self.offset.y = int(pos.y) - self.half_screen_size.y
+
+        # only draw sprites that can actually be seen
+        ordered_sprites = sprite_group.ordered_sprites()
+        visible_sprites = self.cull(
+            ordered_sprites,
+            [sprite_group.get_draw_position(s, interpolation) for s in ordered_sprites]
+        )
+        view_rect = self.get_view_rect()
+
+        # render sprites sorted in y position and z index,
+        # drawing each tile map before the sprites with the same or higher z index
+        start = 0
+        for tile_map in sorted(tile_maps, key = lambda t: t.z_index):
+            end = bisect.bisect_left(visible_sprites, tile_map.z_index, lo = start, key = lambda s: s[0].z_index)
+            self._blit_sprites(surface, visible_sprites[start:end])
+            tile_map.render(surface, view_rect)
+            start = end
+        self._blit_sprites(surface, visible_sprites[start:])
\ No newline at end of file
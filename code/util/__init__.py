@@ -1,3 +1,3 @@
-from .parsers import parse_spritesheet, SaveHelper, AutoSaver
+from .parsers import parse_spritesheet, get_animation_frames, clear_animation_bank, SaveHelper, AutoSaver
 from .misc import *
 from .debug_window import DebugWindow
\ No newline at end of file
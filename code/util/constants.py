@@ -1,7 +1,12 @@
 import sys, os
 
 STARTUP_SCREEN_SIZE = 1280, 720
-FPS = 60
+# default frame rate cap, can be changed with the max-fps config option. higher than the tick rate so movement is drawn smoothly
+FPS = 120
+# simulation updates per second, independent of frame rate
+TICK_RATE = 60
+# most updates to run in a single frame before dropping time, so slow frames do not cause more slow frames
+MAX_TICKS_PER_FRAME = 3
 
 IN_DEBUG = "-debug" in sys.argv or "-d" in sys.argv
 
@@ -14,8 +19,12 @@ HEALTH_VISIBILITY_TIME = 60
 
 ANIMATION_FRAME_TIME = 10
 
-RUN_SAVE_PATH = os.path.join("saves", "current_run.dat")
-CONFIG_SAVE_PATH = os.path.join("saves", "config.json")
+# can be moved with the NATURES_ASCENT_SAVES environment variable, e.g so benchmarks do not touch real saves
+SAVE_FOLDER = os.environ.get("NATURES_ASCENT_SAVES", "saves")
+RUN_SAVE_PATH = os.path.join(SAVE_FOLDER, "current_run.dat")
+CONFIG_SAVE_PATH = os.path.join(SAVE_FOLDER, "config.json")
+# pre-scaled images, built with "main.py -pack-assets"
+ASSET_PACK_PATH = os.path.join("assets", "images.pack")
 
 INTERACT_DISTANCE = TILE_SIZE * 1.5
 
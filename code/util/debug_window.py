@@ -534,6 +534,7 @@ class Console(Element):
             ConsoleCommand("heal", (), self._cmd_heal, "heal the player to max hp", restrict_context = "level"),
             ConsoleCommand("health", ("health",), self._cmd_health, "set player max health", restrict_context = "level"),
             ConsoleCommand("damage", ("damage",), self._cmd_damage, "set primary weapon damage", restrict_context = "level"),
+            ConsoleCommand("assets", (), self._cmd_assets, "show loaded assets and their memory use"),
         ]
 
         for cmd in self.commands:
@@ -608,6 +609,17 @@ class Console(Element):
         player.stats.health = x
         return f"Set player health to %{DB_NUM_COLOUR}{x}"
 
+    def _cmd_assets(self) -> str:
+        report = self.manager.get_residency_report()
+        lines = []
+        for asset_type, info in report.items():
+            lines.append(f"{asset_type}: %{DB_NUM_COLOUR}{info['loaded']}%{DB_TEXT_COLOUR}/%{DB_NUM_COLOUR}{info['indexed']}%{DB_TEXT_COLOUR} loaded, %{DB_NUM_COLOUR}{round(info['bytes'] / 1024)}%{DB_TEXT_COLOUR} KB")
+        cache = self.manager.get_image_cache_stats()
+        lines.append(f"image cache: %{DB_NUM_COLOUR}{cache['images']}%{DB_TEXT_COLOUR} images, %{DB_NUM_COLOUR}{round(cache['bytes'] / 1024)}%{DB_TEXT_COLOUR} KB, %{DB_NUM_COLOUR}{cache['hits']}%{DB_TEXT_COLOUR} hits, %{DB_NUM_COLOUR}{cache['misses']}%{DB_TEXT_COLOUR} misses")
+        text_cache = self.manager.get_text_cache_stats()
+        lines.append(f"text cache: %{DB_NUM_COLOUR}{text_cache['texts']}%{DB_TEXT_COLOUR} texts, %{DB_NUM_COLOUR}{text_cache['hits']}%{DB_TEXT_COLOUR} hits, %{DB_NUM_COLOUR}{text_cache['misses']}%{DB_TEXT_COLOUR} misses")
+        return "\n".join(lines)
+
     def _cmd_damage(self, damage: str) -> str:
         try:
             x = int(damage)
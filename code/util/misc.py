@@ -1,4 +1,5 @@
 import pygame, math, random
+from collections import OrderedDict
 from typing import Optional, Literal, TypeVar
 from engine.types import *
 
@@ -100,40 +101,44 @@ def sign(n: float) -> Literal[1, -1, 0]:
     if n < 0: return -1
     return 0
 
+# outlines made by create_outline, least recently used first
+_outline_cache: OrderedDict[tuple[pygame.Surface, int, Colour], pygame.Surface] = OrderedDict()
+_OUTLINE_CACHE_SIZE = 64
+
 def create_outline(image: pygame.Surface, pixel_scale: int = 1, outline_colour: Colour = (255, 255, 255)) -> pygame.Surface:
-    """Creates an outline around the image using the image's alpha values. The resulting image is the image size + 2 * `pixel_scale` to account for extra space."""
+    """
+    Creates an outline around the image using the image's alpha values. The resulting image is the image size + 2 * `pixel_scale` to account for extra space.
+
+    Outlines are cached for each image, so the result must not be changed.
+    """
+    key = (image, pixel_scale, tuple(outline_colour))
+    outline = _outline_cache.get(key)
+    if outline != None:
+        _outline_cache.move_to_end(key)
+        return outline
+
     # scale image to pixel scale
     img = pygame.transform.scale_by(image, 1 / pixel_scale)
 
     # add padding around the image to be able to fit an outline
     padded_image = pygame.Surface((img.get_width() + 2, img.get_height() + 2), pygame.SRCALPHA)
     padded_image.blit(img, (1, 1))
-    # convert the image to a array of alpha values
-    pa = pygame.PixelArray(padded_image)
-    pa_width, pa_height, *_ = pa.shape
-    alphas = [[0 for _ in range(pa_width)] for _ in range(pa_height)]
-    for x in range(pa_width):
-        for y in range(pa_height):
-            alphas[y][x] = 1 if image.unmap_rgb(pa[x, y])[3] > 0 else 0
-    pa.close()
-
-    # helper function to retrieve pixel alphas, defaulting to 0 if out of bounds
-    get_value = lambda x, y: alphas[y][x] if 0 <= x < len(alphas[0]) and 0 <= y < len(alphas) else 0
+    # every pixel that is not fully transparent
+    mask = pygame.mask.from_surface(padded_image, 0)
 
     # fill pixel if adjacent pixel is opaque
-    new = pygame.Surface((pa_width, pa_height), pygame.SRCALPHA)
-    newa = pygame.PixelArray(new)
-    for x in range(pa_width):
-        for y in range(pa_height):
-            if get_value(x, y) == 0:
-                if (get_value(x + 1, y) == 1 or
-                    get_value(x - 1, y) == 1 or
-                    get_value(x, y + 1) == 1 or
-                    get_value(x, y - 1) == 1):
-
-                    newa[x, y] = image.map_rgb(outline_colour)
-
-    return pygame.transform.scale_by(new, pixel_scale)
+    outline_mask = pygame.Mask(mask.get_size())
+    for offset in ((1, 0), (-1, 0), (0, 1), (0, -1)):
+        outline_mask.draw(mask, offset)
+    outline_mask.erase(mask, (0, 0))
+
+    new = outline_mask.to_surface(setcolor = outline_colour, unsetcolor = (0, 0, 0, 0))
+    outline = pygame.transform.scale_by(new, pixel_scale)
+
+    _outline_cache[key] = outline
+    if len(_outline_cache) > _OUTLINE_CACHE_SIZE:
+        _outline_cache.popitem(last = False)
+    return outline
 
 T = TypeVar("T")
 def choose_weighted(weighted_dict: dict[T, int]) -> T:
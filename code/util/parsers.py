@@ -2,13 +2,14 @@ import pygame
 import os, base64
 from typing import Literal
 
-from engine import Node, Logger
+from engine import Node, Logger, Manager
 
 def parse_spritesheet(spritesheet: pygame.Surface, *, frame_count: int = None, frame_size: tuple[int, int] = None, assume_square: bool = False, direction: Literal["x", "y"] = "x") -> list[pygame.Surface]:
     """
     Returns a list of surfaces containing each frame of the sprite sheet.
 
-    Modifications to the base spritesheet will not affect the resulting frames.
+    Frames are subsurfaces that share pixels with the spritesheet, so drawing on one changes the spritesheet (and the
+    image returned by ``Manager.get_image``). Copy a frame before drawing on it.
 
     Modes in order of priority:
     1. assume_square: Splits the spritesheet into square frames.
@@ -34,17 +35,46 @@ def parse_spritesheet(spritesheet: pygame.Surface, *, frame_count: int = None, f
 
     frames = []
     for i in range(n):
-        frame = pygame.Surface((width, height), pygame.SRCALPHA)
+        x_offset = i * width if direction == "x" else 0
+        y_offset = i * height if direction == "y" else 0
 
-        x_offset = -i * width if direction == "x" else 0
-        y_offset = -i * height if direction == "y" else 0
-
-        frame.blit(spritesheet, (x_offset, y_offset))
+        frame_rect = pygame.Rect(x_offset, y_offset, width, height)
+        if spritesheet.get_rect().contains(frame_rect):
+            frame = spritesheet.subsurface(frame_rect)
+        else:
+            # frame goes past the edge of the spritesheet, so copy it onto a transparent surface
+            frame = pygame.Surface(frame_rect.size, pygame.SRCALPHA)
+            frame.blit(spritesheet, (-frame_rect.x, -frame_rect.y))
 
         frames.append(frame)
 
     return frames
 
+# frames of each parsed spritesheet, shared between all animations that use them
+_animation_bank: dict[tuple, tuple[pygame.Surface, ...]] = {}
+
+def get_animation_frames(manager: Manager, image_key: str, scale: float = 1.0, *, row: int = 0, row_count: int = 1, **kwargs) -> tuple[pygame.Surface, ...]:
+    """
+    Returns the frames of the spritesheet at ``image_key``, split using ``parse_spritesheet`` with ``kwargs``.
+
+    If ``row_count`` is more than 1, the spritesheet is first split into that many rows and only ``row`` is used.
+
+    Each spritesheet is only parsed once - the frames are shared with every other caller so must not be drawn on or changed.
+    """
+    key = (image_key, scale, row, row_count, tuple(sorted(kwargs.items())))
+    frames = _animation_bank.get(key)
+    if frames == None:
+        spritesheet = manager.get_image(image_key, scale)
+        if row_count > 1:
+            spritesheet = parse_spritesheet(spritesheet, frame_count = row_count, direction = "y")[row]
+        frames = tuple(parse_spritesheet(spritesheet, **kwargs))
+        _animation_bank[key] = frames
+    return frames
+
+def clear_animation_bank() -> None:
+    """Remove all shared animation frames, e.g after assets are reloaded"""
+    _animation_bank.clear()
+
 def count_lines(root_path: str, comment: str = "#", ext: str = "py", exclude_dir: tuple[str] = ("external", "pygame")) -> dict:
     """Counts number of lines in directory in files ending with ext. Passing in no extensions results in reading every file."""
     total_lines = 0
@@ -97,13 +127,10 @@ class SaveHelper:
     def save_file(data: str | bytes, filepath: str, obfuscate: bool = False) -> None:
         """Save a file with string data"""
         # create all folders in path if they don't already exists
+        folder = os.path.dirname(filepath)
+        if folder:
+            os.makedirs(folder, exist_ok = True)
 
-        accumulated_path = ""
-        for folder in os.path.dirname(filepath).split(os.path.sep):
-            accumulated_path += folder
-            if not os.path.exists(accumulated_path):
-                os.mkdir(accumulated_path)
-        
         data_to_save = SaveHelper.encode_data(data) if obfuscate else data
         with open(filepath, "wb" if isinstance(data_to_save, bytes) else "w") as f:
             f.write(data_to_save)
@@ -1,3 +1,3 @@
-from .tile import Tile, TileSet
+from .tile import WallCollider, TileSet, TileMap, CollisionGrid, merge_tiles
 from .floor import FloorManager, Room
 from .interactable import Interactable, WorldItem, Chest, ItemChest, PickupChest
\ No newline at end of file
@@ -5,13 +5,13 @@ import random
 from typing import Literal, Type
 
 from engine.types import *
-from engine import Node, Sprite
+from engine import Node, Sprite, SpatialHashGroup
 from entity import Player, Enemy, Slime, TreeBoss
 from item import Health, Coin
 import util
 from util.constants import *
 
-from .tile import Tile, TileSet, TileCollection
+from .tile import WallCollider, TileSet, TileMap, CollisionGrid, merge_tiles
 from .interactable import ItemChest, PickupChest, PrayerStatue, SpawnPortal
 
 room_directions: list[Direction] = ["left", "right", "up", "down"]
@@ -27,6 +27,13 @@ tile_indexes = {
 }
 
 class DarkOverlay(Sprite):
+    static = True
+
+    # fades drawn over doors into activated rooms, keyed by door direction and number of fade steps
+    _fade_strips: dict[tuple[Direction, int], pygame.Surface] = {}
+    # images filling the transparent parts of wall tiles, keyed by tile image (shared by all tiles with the same tile set index)
+    _tile_masks: dict[pygame.Surface, pygame.Surface] = {}
+
     def __init__(self, parent: Room, death_time: int = 10) -> None:
         super().__init__(parent, groups = ["render", "update"])
         self.parent: Room
@@ -60,37 +67,53 @@ class DarkOverlay(Sprite):
                 for door_position in doors:
                     pygame.draw.rect(self.image, BLACK, (door_position[0] * TILE_SIZE, door_position[1] * TILE_SIZE, TILE_SIZE, TILE_SIZE))
             else:
+                fade_strip = self._get_fade_strip(direction)
                 for door in doors:
-                    # calculate the size of the fade - flips depending on which way the door is facing
-                    fade_size = (
-                        TILE_SIZE if direction_vector[direction][0] == 0 else TILE_SIZE / self.fade_steps,
-                        TILE_SIZE if direction_vector[direction][1] == 0 else TILE_SIZE / self.fade_steps,
-                    )
-                    # draw a line of decreasing opacity lengthways along the door
-                    for i in range(self.fade_steps):
-                        step_alpha = (1 - i / self.fade_steps) * 255
-                        offset = pygame.Vector2(direction_vector[direction]) * TILE_SIZE * (i / self.fade_steps)
-
-                        x = door[0] * (TILE_SIZE) + offset[0]
-                        y = door[1] * (TILE_SIZE) + offset[1]
-
-                        # flip depending on left and up faces
-                        if direction == "left":
-                            x = (door[0] + 1) * TILE_SIZE + offset[0] - TILE_SIZE / self.fade_steps
-                            y = door[1] * TILE_SIZE + offset[1]
-                        elif direction == "up":
-                            y = (door[1] + 1) * TILE_SIZE + offset[1] - TILE_SIZE / self.fade_steps
-
-                        self.image.fill((0, 0, 0, max(step_alpha, 0)), [x, y, *fade_size])
+                    # nothing has been drawn over doors yet, so the fade can be copied straight on
+                    self.image.blit(fade_strip, (door[0] * TILE_SIZE, door[1] * TILE_SIZE), special_flags = pygame.BLEND_RGBA_MAX)
 
         # fill in transparent tile spaces
-        for position, tile in self.parent.wall_tiles.items():
-            mask = pygame.mask.from_surface(tile.image)
-            mask_image = mask.to_surface(setcolor = (255, 0, 0, 0), unsetcolor = (0, 0, 0, 255))
-            self.image.blit(mask_image, (position[0] * TILE_SIZE, position[1] * TILE_SIZE))
+        for position, index in self.parent.wall_tiles.items():
+            self.image.blit(self._get_tile_mask(floor_manager.wall_tileset.get(index)), (position[0] * TILE_SIZE, position[1] * TILE_SIZE))
 
         self.update_alpha()
-        
+
+    def _get_fade_strip(self, direction: Direction) -> pygame.Surface:
+        key = (direction, self.fade_steps)
+        strip = DarkOverlay._fade_strips.get(key)
+        if strip != None: return strip
+
+        strip = pygame.Surface((TILE_SIZE, TILE_SIZE), pygame.SRCALPHA)
+        # calculate the size of the fade - flips depending on which way the door is facing
+        fade_size = (
+            TILE_SIZE if direction_vector[direction][0] == 0 else TILE_SIZE / self.fade_steps,
+            TILE_SIZE if direction_vector[direction][1] == 0 else TILE_SIZE / self.fade_steps,
+        )
+        # draw a line of decreasing opacity lengthways along the door
+        for i in range(self.fade_steps):
+            step_alpha = (1 - i / self.fade_steps) * 255
+            offset = pygame.Vector2(direction_vector[direction]) * TILE_SIZE * (i / self.fade_steps)
+
+            x, y = offset
+            # flip depending on left and up faces
+            if direction == "left":
+                x = TILE_SIZE + offset[0] - TILE_SIZE / self.fade_steps
+            elif direction == "up":
+                y = TILE_SIZE + offset[1] - TILE_SIZE / self.fade_steps
+
+            strip.fill((0, 0, 0, max(step_alpha, 0)), [x, y, *fade_size])
+
+        DarkOverlay._fade_strips[key] = strip
+        return strip
+
+    def _get_tile_mask(self, tile_image: pygame.Surface) -> pygame.Surface:
+        mask_image = DarkOverlay._tile_masks.get(tile_image)
+        if mask_image == None:
+            mask = pygame.mask.from_surface(tile_image)
+            mask_image = mask.to_surface(setcolor = (255, 0, 0, 0), unsetcolor = (0, 0, 0, 255))
+            DarkOverlay._tile_masks[tile_image] = mask_image
+        return mask_image
+
     def update_alpha(self) -> None:
         lerped = (1 - (self.death_timer / self.max_time)) * self.starting_alpha
         self.image.set_alpha(max(lerped, 0))
@@ -111,6 +134,8 @@ class DarkOverlay(Sprite):
                         neighbour.dark_overlay.draw_image()
 
 class TempDoor(Sprite):
+    static = True
+
     def __init__(self, parent: Room, direction: Direction):
         super().__init__(parent, ["render", "collide"])
 
@@ -142,6 +167,12 @@ class TempDoor(Sprite):
             self.rect.left = bounding_rect.right
             self.rect.bottom = bounding_rect.centery + TILE_SIZE
 
+        self.parent.parent.collision_grid.add_rect(self.rect)
+
+    def kill(self) -> None:
+        self.parent.parent.collision_grid.remove_rect(self.rect)
+        super().kill()
+
 class Room(Node):
     def __init__(self, parent: FloorManager, origin: Vec2, room_size: int, forced_doors: list[Direction] = [], blacklisted_doors: list[Direction] = [], tags: list[str] = [], enemies: dict[Type[Enemy], int] = {}) -> None:
         super().__init__(parent)
@@ -155,16 +186,15 @@ class Room(Node):
         self.connections: list[Direction] = []
         self.door_positions: list[tuple[int, int]] = []
 
-        # store reference to each wall tile and floor tile
-        self.wall_tiles: dict[Vec2, Tile] = {}
-        self.floor_tiles: dict[Vec2, Tile] = {}
+        # store the tile set index of each wall tile
+        self.wall_tiles: dict[Vec2, int] = {}
 
         # store each alive enemy
         self.enemies = pygame.sprite.Group()
         # store doors that appear when player arrives
         self.temp_doors = pygame.sprite.Group()
-        # store wall tiles
-        self.collide_sprites = pygame.sprite.Group() 
+        # store wall colliders
+        self.collide_sprites = SpatialHashGroup()
 
         # store possible enemies which will be spawned upon room activation
         self._possible_enemies = enemies
@@ -201,7 +231,6 @@ class Room(Node):
     def place_in_world(self) -> None:
         """Adds the room's tiles and enemies into the world"""
         self.add_tiles()
-        self.optimise_tiles()
 
         self.dark_overlay = self.add_child(DarkOverlay(self))
         self.player: Player = self.manager.get_object("player")
@@ -251,31 +280,28 @@ class Room(Node):
                     case "down":
                         position = (i, last_index)
                             
-                self.add_tile(self.parent.wall_tileset.get(index), position, True)
+                self.add_tile(index, position, True)
 
             # corners
-            self.add_tile(self.parent.wall_tileset.get(0), (0, 0), True)
-            self.add_tile(self.parent.wall_tileset.get(2), (last_index, 0), True)
-            self.add_tile(self.parent.wall_tileset.get(12), (last_index, last_index), True)
-            self.add_tile(self.parent.wall_tileset.get(10), (0, last_index), True)
+            self.add_tile(0, (0, 0), True)
+            self.add_tile(2, (last_index, 0), True)
+            self.add_tile(12, (last_index, last_index), True)
+            self.add_tile(10, (0, last_index), True)
 
         # add floors
         for x in range(self.room_size):
             for y in range(self.room_size):
-                self.add_tile(self.parent.grass_tileset.get(random.randint(0, 3)), (x, y), False)
+                self.add_tile(random.randint(0, 3), (x, y), False)
 
-    def optimise_tiles(self) -> None:
-        """Combine tiles into a single sprite for faster rendering"""
-        self.add_child(TileCollection(self, self.floor_tiles.values(), z_index = -1))
-        self.add_child(TileCollection(self, self.wall_tiles.values(), z_index = -0.1))
+        self.add_wall_colliders()
 
-        # kill original tiles
-        for tile in self.floor_tiles.values():
-            tile.kill()
-        for tile in self.wall_tiles.values():
-            tile.remove(self.manager.groups["render"])
-        #del self.floor_tiles
-        #del self.wall_tiles
+    def add_wall_colliders(self) -> None:
+        """Add colliders for the wall tiles, merging neighbouring tiles into as few rects as possible"""
+        for rect in merge_tiles(self.wall_tiles):
+            world_rect = pygame.Rect(self.room_to_world_coord(rect.topleft), (rect.width * TILE_SIZE, rect.height * TILE_SIZE))
+            collider = self.add_child(WallCollider(self, world_rect))
+            self.collide_sprites.add(collider)
+            self.parent.collision_grid.add_rect(collider.rect)
 
     def get_door_position(self, direction: Direction) -> tuple[Vec2, Vec2]:
         """Get the relative room coordinates of the doors in the specified direction"""
@@ -311,20 +337,22 @@ class Room(Node):
         """Convert a room based coord into a world pixel coordinate."""
         return pygame.Vector2(self.origin) * TILE_SIZE * self.room_size + pygame.Vector2(room_coord) * TILE_SIZE
 
-    def add_tile(self, image: pygame.Surface, relative_position: Vec2, collider: bool) -> None:
-        # convert relative grid coords to world coords
-        position = self.room_to_world_coord(relative_position)
-        # add tile
-        tile = Tile(self, image, position, collider)
+    def room_to_tile_coord(self, room_coord: Vec2) -> Vec2:
+        """Convert a room based coord into a world tile coordinate."""
+        return (self.origin[0] * self.room_size + room_coord[0], self.origin[1] * self.room_size + room_coord[1])
+
+    def add_tile(self, index: int, relative_position: Vec2, collider: bool) -> None:
+        """Add a tile from the wall (if collider) or grass tileset into the world"""
+        tile_map: TileMap = self.parent.wall_map if collider else self.parent.floor_map
+        tile_map.set_tile(self.room_to_tile_coord(relative_position), index)
+
+        # walls are given colliders once every tile is added
         if collider:
-            self.wall_tiles[relative_position] = tile
-            self.collide_sprites.add(tile)
-        else:
-            self.floor_tiles[relative_position] = tile
-        self.add_child(tile)
+            self.wall_tiles[relative_position] = index
 
     def activate(self) -> None:
         self._activated = True
+        self.parent.room_state_version += 1
         self.dark_overlay.queue_death()
         self.add_enemies()
 
@@ -352,6 +380,7 @@ class Room(Node):
         self._possible_enemies = {}
         self._activated = True
         self._completed = True
+        self.parent.room_state_version += 1
         self.dark_overlay.queue_death()
 
     def update(self) -> None:
@@ -362,6 +391,7 @@ class Room(Node):
         if not self._completed and self._activated:
             if len(self.enemies) == 0:
                 self._completed = True
+                self.parent.room_state_version += 1
                 self.on_completion()
                 # remove doors
                 for sprite in self.temp_doors:
@@ -421,13 +451,19 @@ class UpgradeRoom(SpecialRoom):
         self.tags.append("upgrade")
         self.statue = self.add_child(PrayerStatue(self, (self.bounding_rect.centerx, self.bounding_rect.centery - TILE_SIZE * 1)))
         # add collider for statue base
-        s = self.add_child(Sprite(self, groups = ["collide"]))
-        s.rect = pygame.Rect(0, 0, TILE_SIZE * 2, TILE_SIZE * 2 + 4)
-        s.rect.bottom = self.statue.rect.bottom
-        s.rect.centerx = self.statue.rect.centerx
-        
+        self.statue_collider = self.add_child(Sprite(self, groups = ["collide"]))
+        self.statue_collider.rect = pygame.Rect(0, 0, TILE_SIZE * 2, TILE_SIZE * 2 + 4)
+        self.statue_collider.rect.bottom = self.statue.rect.bottom
+        self.statue_collider.rect.centerx = self.statue.rect.centerx
+
+    def place_in_world(self) -> None:
+        super().place_in_world()
+        # the statue base is not aligned to tiles, so only block the tiles it fully covers
+        self.parent.collision_grid.add_rect(self.statue_collider.rect, round_inward = True)
+
     def activate(self) -> None:
         self._activated = True
+        self.parent.room_state_version += 1
         self.dark_overlay.queue_death()
 
     def on_completion(self) -> None:
@@ -446,6 +482,8 @@ class FloorManager(Node):
         self.grass_tileset = TileSet(self.manager.get_image("world/grass_tiles"), TILE_SIZE)
 
         self.rooms: dict[Vec2, Room] = {}
+        # increased whenever a room is activated or completed, so room states only need checking when it changes
+        self.room_state_version = 0
 
     def generate(self, seed: float | None = None) -> None:
         """Generate a floor from given seed. If the seed None, a random seed is generated"""
@@ -484,11 +522,27 @@ class FloorManager(Node):
 
         self.player = self.add_child(Player(self, self.spawn_room.bounding_rect.center - pygame.Vector2(TILE_SIZE / 2, TILE_SIZE)))
 
+        # create tile maps covering every room
+        min_x = min(origin[0] for origin in self.rooms)
+        min_y = min(origin[1] for origin in self.rooms)
+        max_x = max(origin[0] for origin in self.rooms)
+        max_y = max(origin[1] for origin in self.rooms)
+        tile_bounds = pygame.Rect(
+            min_x * self.room_size,
+            min_y * self.room_size,
+            (max_x - min_x + 1) * self.room_size,
+            (max_y - min_y + 1) * self.room_size
+        )
+        self.floor_map = self.add_child(TileMap(self, self.grass_tileset, tile_bounds, z_index = -1))
+        self.wall_map = self.add_child(TileMap(self, self.wall_tileset, tile_bounds, z_index = -0.1))
+        # tiles blocked by walls, doors and statues, for fast line of sight and projectile checks
+        self.collision_grid = CollisionGrid(tile_bounds)
+
         for room in self.rooms.values():
             room.place_in_world()
             room.dark_overlay.draw_image()
 
-    def _get_type_of_tile(self, wall_tiles: dict[Vec2, Tile], all_tiles: dict[Vec2, Tile] , coord: Vec2) -> Literal["wall", "floor", "world"]:
+    def _get_type_of_tile(self, wall_tiles: dict[Vec2, int], all_tiles: dict[Vec2, int] , coord: Vec2) -> Literal["wall", "floor", "world"]:
         return "wall" if coord in wall_tiles else "floor" if coord in all_tiles else "world"
 
     def _create_room(self, origin: Vec2, tags: list[str] = []) -> Room:
@@ -83,6 +83,8 @@ class WorldItem(Interactable):
             self.manager.get_object("player").interact_overlay.rect.centery = self.rect.centery
 
 class Chest(Interactable):
+    static = True
+
     def __init__(self, parent: Node, position: Vec2) -> None:
         super().__init__(parent)
 
@@ -147,9 +149,9 @@ class InteractableCostText(Sprite):
     def update_text(self, text: str) -> None:
         """Update sub text"""
         self._text = text
-        title_image = self.manager.get_font("alagard", 32).render(self._title, True, PLAYER_GREEN)
-        title_shadow = self.manager.get_font("alagard", 32).render(self._title, True, PLAYER_DARKGREEN)
-        text_image = self.manager.get_font("alagard", 16).render(self._text, True, lerp_colour(self._text_colour, self._flash_colour, max(self._t / self._flash_time, 0)))
+        title_image = self.manager.render_text(self.manager.get_font("alagard", 32), self._title, PLAYER_GREEN)
+        title_shadow = self.manager.render_text(self.manager.get_font("alagard", 32), self._title, PLAYER_DARKGREEN)
+        text_image = self.manager.render_text(self.manager.get_font("alagard", 16), self._text, lerp_colour(self._text_colour, self._flash_colour, max(self._t / self._flash_time, 0)))
         icon = self._icon
 
         icontext_size = (
@@ -197,6 +199,8 @@ class InteractableCostText(Sprite):
             self._t = 0
 
 class PrayerStatue(Interactable):
+    static = True
+
     def __init__(self, parent: Node, position: Vec2) -> None:
         super().__init__(parent, ["render"])
         self.image = self.manager.get_image("world/statue")
@@ -242,6 +246,8 @@ class PrayerStatue(Interactable):
         self.update_hover_text()
 
 class SpawnPortal(Interactable):
+    static = True
+
     def __init__(self, parent: Node, position: Vec2) -> None:
         super().__init__(parent, ["render"])
         self.image = self.manager.get_image("world/spawn_portal")
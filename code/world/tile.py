@@ -1,20 +1,42 @@
-import pygame, random
+import pygame, math
+from typing import Iterable
+from collections import OrderedDict
 from engine import Sprite, Node
 from engine.types import *
 from util import parse_spritesheet
+from util.constants import *
 
-class Tile(Sprite):
-    def __init__(self, parent: Node, image: pygame.Surface, pos: Vec2, collider: bool) -> None:
-        super().__init__(parent = parent, groups=["render"])
-        if collider:
-            self.add(self.manager.groups["collide"])
-        else:
-            # floor tile
-            self.z_index -= 1
+class WallCollider(Sprite):
+    """A rectangle of wall tiles merged into a single collider. Walls are drawn by a ``TileMap``, so colliders have no image."""
+    static = True
+
+    def __init__(self, parent: Node, rect: pygame.Rect) -> None:
+        super().__init__(parent = parent, groups = ["collide"])
+        self.rect = rect.copy()
+
+def merge_tiles(tile_coords: Iterable[Vec2]) -> list[pygame.Rect]:
+    """
+    Greedily merge tile coords into rects (in tile coords) covering exactly those tiles.
+
+    Going through tiles row by row, each rect is grown as far right as possible, then down while every tile below it is free.
+    """
+    remaining = set(tile_coords)
+    rects = []
+    for x, y in sorted(remaining, key = lambda coord: (coord[1], coord[0])):
+        if (x, y) not in remaining: continue
+
+        width = 1
+        while (x + width, y) in remaining:
+            width += 1
+        height = 1
+        while all((x + i, y + height) in remaining for i in range(width)):
+            height += 1
 
-        self.image = image
-        self.rect = self.image.get_rect(topleft = pos)
-        self.is_wall = collider
+        for j in range(height):
+            for i in range(width):
+                remaining.remove((x + i, y + j))
+        rects.append(pygame.Rect(x, y, width, height))
+    return rects
  
 class TileSet(DebugExpandable):
     """Generate an indexed tileset (row then column)"""
@@ -29,22 +51,189 @@ class TileSet(DebugExpandable):
     def get(self, key: int) -> None:
         return self._tiles[key]
 
-class TileCollection(Sprite):
-    """Collect a set of tiles into a single surface which is faster to render."""
-    def __init__(self, parent: Node, tiles: list[Tile], z_index: float = 0):
-        super().__init__(parent = parent, groups=["render"], z_index = z_index)
-        # get min and max bounds
-        min_coord = pygame.Vector2(
-            min(tiles, key = lambda t: t.rect.x).rect.x,
-            min(tiles, key = lambda t: t.rect.y).rect.y
-        )
-        max_coord = pygame.Vector2(
-            max(tiles, key = lambda t: t.rect.right).rect.right,
-            max(tiles, key = lambda t: t.rect.bottom).rect.bottom
-        )
-
-        self.image = pygame.Surface((max_coord.x - min_coord.x, max_coord.y - min_coord.y), pygame.SRCALPHA)
-        self.rect = self.image.get_rect(topleft = min_coord)
-
-        for tile in tiles:
-            self.image.blit(tile.image, (tile.rect.x - min_coord.x, tile.rect.y - min_coord.y))
+class TileMap(Node):
+    """
+    Draws a layer of tiles from a grid of ``TileSet`` indexes.
+
+    The grid is split into square chunks which are only drawn when overlapping the camera. Chunk surfaces are
+    created the first time they are seen and the least recently used chunks are thrown away once more than
+    ``max_cached_chunks`` are stored.
+    """
+    EMPTY = -1
+
+    def __init__(self, parent: Node, tile_set: TileSet, bounds: pygame.Rect, z_index: float = 0, chunk_size: int = 8, max_cached_chunks: int = 64) -> None:
+        super().__init__(parent)
+        self.tile_set = tile_set
+        # area covered by the map, in tile coords
+        self.bounds = bounds.copy()
+        self.z_index = z_index
+        self.chunk_size = chunk_size
+        self.chunk_pixel_size = chunk_size * TILE_SIZE
+        self.max_cached_chunks = max_cached_chunks
+
+        # tile set index of each tile, stored as rows
+        self._grid: list[list[int]] = [[TileMap.EMPTY] * bounds.width for _ in range(bounds.height)]
+
+        # maps chunk coord to surface, ordered from least to most recently used
+        # chunks with no tiles are stored as None
+        self._chunks: OrderedDict[Vec2, pygame.Surface | None] = OrderedDict()
+
+    def set_tile(self, tile_coord: Vec2, index: int) -> None:
+        """Set the tile at a world tile coordinate"""
+        x, y = int(tile_coord[0] - self.bounds.x), int(tile_coord[1] - self.bounds.y)
+        if not (0 <= x < self.bounds.width and 0 <= y < self.bounds.height):
+            raise IndexError(f"Tile coord {tile_coord} is outside of map bounds {self.bounds}")
+        self._grid[y][x] = index
+        # chunk needs to be redrawn next time it is seen
+        self._chunks.pop((x // self.chunk_size, y // self.chunk_size), None)
+
+    def get_tile(self, tile_coord: Vec2) -> int:
+        """Get the tile set index at a world tile coordinate, or ``TileMap.EMPTY`` if there is no tile"""
+        x, y = int(tile_coord[0] - self.bounds.x), int(tile_coord[1] - self.bounds.y)
+        if not (0 <= x < self.bounds.width and 0 <= y < self.bounds.height):
+            return TileMap.EMPTY
+        return self._grid[y][x]
+
+    def _draw_chunk(self, chunk_coord: Vec2) -> pygame.Surface | None:
+        first_x, first_y = chunk_coord[0] * self.chunk_size, chunk_coord[1] * self.chunk_size
+        surface = None
+        for y in range(first_y, min(first_y + self.chunk_size, self.bounds.height)):
+            row = self._grid[y]
+            for x in range(first_x, min(first_x + self.chunk_size, self.bounds.width)):
+                if row[x] == TileMap.EMPTY: continue
+                # only create a surface if the chunk has any tiles
+                if surface == None:
+                    surface = pygame.Surface((self.chunk_pixel_size, self.chunk_pixel_size), pygame.SRCALPHA)
+                surface.blit(self.tile_set.get(row[x]), ((x - first_x) * TILE_SIZE, (y - first_y) * TILE_SIZE))
+        return surface
+
+    def get_chunk(self, chunk_coord: Vec2) -> pygame.Surface | None:
+        """Returns the surface of a chunk, drawing it if it is not cached"""
+        if chunk_coord in self._chunks:
+            self._chunks.move_to_end(chunk_coord)
+            return self._chunks[chunk_coord]
+
+        surface = self._draw_chunk(chunk_coord)
+        self._chunks[chunk_coord] = surface
+        # evict least recently used chunks
+        while len(self._chunks) > self.max_cached_chunks:
+            self._chunks.popitem(last = False)
+        return surface
+
+    def render(self, surface: pygame.Surface, view_rect: pygame.Rect) -> None:
+        """Draw the chunks that overlap ``view_rect`` (in world coords) onto surface"""
+        origin_x = self.bounds.x * TILE_SIZE
+        origin_y = self.bounds.y * TILE_SIZE
+        n_chunks_x = math.ceil(self.bounds.width / self.chunk_size)
+        n_chunks_y = math.ceil(self.bounds.height / self.chunk_size)
+
+        # range of chunks visible, clamped to the map
+        first_x = max((view_rect.left - origin_x) // self.chunk_pixel_size, 0)
+        first_y = max((view_rect.top - origin_y) // self.chunk_pixel_size, 0)
+        last_x = min((view_rect.right - 1 - origin_x) // self.chunk_pixel_size, n_chunks_x - 1)
+        last_y = min((view_rect.bottom - 1 - origin_y) // self.chunk_pixel_size, n_chunks_y - 1)
+
+        blit_sequence = []
+        for chunk_y in range(first_y, last_y + 1):
+            for chunk_x in range(first_x, last_x + 1):
+                chunk = self.get_chunk((chunk_x, chunk_y))
+                if chunk == None: continue
+                blit_sequence.append((chunk, (
+                    origin_x + chunk_x * self.chunk_pixel_size - view_rect.x,
+                    origin_y + chunk_y * self.chunk_pixel_size - view_rect.y
+                )))
+        surface.blits(blit_sequence, doreturn = False)
+
+class CollisionGrid:
+    """
+    Counts the colliders covering each tile in an area (in tile coords), so that points, rects and lines can be
+    checked against walls without looking at any sprites.
+
+    Colliders that are not aligned to tiles block every tile they touch, or only the tiles they fully cover if added
+    with ``round_inward``. Tiles outside the area are never blocked.
+    """
+    def __init__(self, bounds: pygame.Rect) -> None:
+        self.bounds = bounds.copy()
+        # number of colliders covering each tile, stored as rows
+        self._grid: list[list[int]] = [[0] * bounds.width for _ in range(bounds.height)]
+
+    def _change_rect(self, rect: pygame.Rect, amount: int, round_inward: bool) -> None:
+        if round_inward:
+            # tiles fully inside the rect
+            first_x, first_y = -(-rect.left // TILE_SIZE), -(-rect.top // TILE_SIZE)
+            last_x, last_y = rect.right // TILE_SIZE - 1, rect.bottom // TILE_SIZE - 1
+        else:
+            # tiles overlapped by the rect. touching a tile's edge does not count as overlapping
+            first_x, first_y = rect.left // TILE_SIZE, rect.top // TILE_SIZE
+            last_x, last_y = (rect.right - 1) // TILE_SIZE, (rect.bottom - 1) // TILE_SIZE
+
+        # clamp to the grid
+        first_x, first_y = max(first_x, self.bounds.left), max(first_y, self.bounds.top)
+        last_x, last_y = min(last_x, self.bounds.right - 1), min(last_y, self.bounds.bottom - 1)
+        for y in range(first_y, last_y + 1):
+            row = self._grid[y - self.bounds.y]
+            for x in range(first_x, last_x + 1):
+                row[x - self.bounds.x] += amount
+
+    def add_rect(self, rect: pygame.Rect, round_inward: bool = False) -> None:
+        """Block the tiles covered by a collider's rect (in world coords)"""
+        self._change_rect(rect, 1, round_inward)
+
+    def remove_rect(self, rect: pygame.Rect, round_inward: bool = False) -> None:
+        """Unblock the tiles covered by a rect previously added with ``add_rect``, using the same ``round_inward``"""
+        self._change_rect(rect, -1, round_inward)
+
+    def is_blocked(self, tile_coord: Vec2) -> bool:
+        """Returns whether the tile at a world tile coordinate is covered by a collider"""
+        x, y = int(tile_coord[0] - self.bounds.x), int(tile_coord[1] - self.bounds.y)
+        if not (0 <= x < self.bounds.width and 0 <= y < self.bounds.height):
+            return False
+        return self._grid[y][x] > 0
+
+    def is_point_blocked(self, world_position: Vec2) -> bool:
+        return self.is_blocked((world_position[0] // TILE_SIZE, world_position[1] // TILE_SIZE))
+
+    def collides_rect(self, rect: pygame.Rect) -> bool:
+        """Returns whether any blocked tile overlaps ``rect`` (in world coords)"""
+        for y in range(rect.top // TILE_SIZE, (rect.bottom - 1) // TILE_SIZE + 1):
+            for x in range(rect.left // TILE_SIZE, (rect.right - 1) // TILE_SIZE + 1):
+                if self.is_blocked((x, y)):
+                    return True
+        return False
+
+    def raycast(self, start: Vec2, end: Vec2) -> pygame.Vector2 | None:
+        """Returns the first point where the line from ``start`` to ``end`` enters a blocked tile, or None if nothing is in the way"""
+        x, y = int(start[0] // TILE_SIZE), int(start[1] // TILE_SIZE)
+        dx, dy = end[0] - start[0], end[1] - start[1]
+        step_x = 1 if dx > 0 else -1
+        step_y = 1 if dy > 0 else -1
+
+        # step through each tile the line passes, using how far along the line (from 0 to 1) the next
+        # vertical and horizontal tile edges are
+        if dx != 0:
+            next_x = ((x + (step_x > 0)) * TILE_SIZE - start[0]) / dx
+            delta_x = TILE_SIZE / abs(dx)
+        else:
+            next_x = delta_x = math.inf
+        if dy != 0:
+            next_y = ((y + (step_y > 0)) * TILE_SIZE - start[1]) / dy
+            delta_y = TILE_SIZE / abs(dy)
+        else:
+            next_y = delta_y = math.inf
+
+        t = 0.0
+        while t <= 1:
+            if self.is_blocked((x, y)):
+                return pygame.Vector2(start[0] + dx * t, start[1] + dy * t)
+            if next_x < next_y:
+                t = next_x
+                next_x += delta_x
+                x += step_x
+            else:
+                t = next_y
+                next_y += delta_y
+                y += step_y
+        return None
+
+    def has_line_of_sight(self, start: Vec2, end: Vec2) -> bool:
+        return self.raycast(start, end) == None